@@ -0,0 +1,170 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+from Nike_Metrics import metrics
+from Nike_Page_Archive import page_archive
+from Nike_Rate_Governor import RateGovernor
+
+# Browser-like headers so Nike serves the same markup a normal visitor gets
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+
+
+# aiohttp tracing hooks that time new connections (DNS + TCP/TLS) and count reused ones
+def _connect_trace():
+    trace = aiohttp.TraceConfig()
+
+    async def connect_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def connect_end(session, ctx, params):
+        metrics.observe('connect', time.perf_counter() - ctx.connect_start)
+
+    async def connection_reused(session, ctx, params):
+        metrics.count('connections_reused')
+
+    trace.on_connection_create_start.append(connect_start)
+    trace.on_connection_create_end.append(connect_end)
+    trace.on_connection_reuseconn.append(connection_reused)
+    return trace
+
+
+# Asyncio fetch engine: one shared connection pool, a global concurrency bound
+# and a per-host politeness limit (max in-flight requests plus a delay between them).
+# Within those bounds a RateGovernor adapts how many requests are in flight and
+# retries throttled or failed ones.
+# With a RecrawlStore attached, pages that are not yet stale are skipped and the
+# rest are fetched with conditional GETs; a 304 comes back as None.
+# Every page downloaded is also kept in the raw page archive, when one is configured.
+class AsyncFetcher:
+    def __init__(self, concurrency=16, per_host=4, delay=0.0, timeout=30, headers=None, store=None, governor=None,
+                 archive=None):
+        self.governor = governor or RateGovernor(maximum=concurrency)
+        self.archive = archive if archive is not None else page_archive
+        self.store = store
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = headers or DEFAULT_HEADERS
+        self.session = None
+        self._host_slots = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers,
+                                             trace_configs=[_connect_trace()])
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    # One semaphore per host so a single storefront never gets more than per_host requests at once
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    # Fetch a single page and return its HTML (None if the store's copy is still current).
+    # Throttled, 5xx and timed-out requests are retried with jittered backoff until the
+    # URL's retry budget is spent, then the last error is raised.
+    async def fetch(self, url):
+        while True:
+            try:
+                html = await self._fetch_once(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = self.governor.retry_delay(url, getattr(e, 'status', None),
+                                                  (getattr(e, 'headers', None) or {}).get('Retry-After'))
+                if delay is None:
+                    raise
+                metrics.count('retries', source=self.governor.name)
+                await asyncio.sleep(delay)
+                continue
+            self.governor.forget(url)
+            return html
+
+    async def _fetch_once(self, url):
+        headers = self.store.conditional_headers(url) if self.store else None
+        await self.governor.acquire_async()
+        try:
+            async with self._host_slot(url):
+                start = time.perf_counter()
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        metrics.count('http_responses', status=response.status)
+                        self.governor.observe(time.perf_counter() - start, response.status,
+                                              response.headers.get('Retry-After'))
+                        if response.status == 304 and self.store:
+                            self.store.touch(url)
+                            html = None
+                        else:
+                            response.raise_for_status()
+                            html = await response.text()
+                            metrics.observe('download', time.perf_counter() - start)
+                            if self.archive is not None:
+                                self.archive.add(url, html, status=response.status)
+                            if self.store:
+                                self.store.record_response(url, response.headers.get('ETag'),
+                                                           response.headers.get('Last-Modified'))
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    self.governor.timed_out()
+                    raise
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+        finally:
+            self.governor.release()
+        return html
+
+    # Fetch every URL with a fixed pool of workers and pass each page to handler(url, html) as it arrives.
+    # Returns the URLs that could not be fetched or whose handler raised; one bad page never stops the rest.
+    async def run(self, urls, handler):
+        if self.store:
+            urls = self.store.filter_stale(urls)
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+        failed = []
+
+        async def worker():
+            while True:
+                try:
+                    url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    html = await self.fetch(url)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"Failed to fetch {url}: {e}")
+                    metrics.count('timeouts' if isinstance(e, asyncio.TimeoutError) else 'fetch_errors', source='http')
+                    failed.append(url)
+                    continue
+                if html is None:
+                    continue
+                try:
+                    handler(url, html)
+                except Exception as e:
+                    print(f"Failed to handle {url}: {e}")
+                    metrics.count('scrape_errors', source='http')
+                    failed.append(url)
+
+        workers = min(self.concurrency, queue.qsize()) or 1
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return failed
+
+
+# Convenience wrapper for synchronous scripts; returns the URLs that could not be fetched or handled
+def fetch_pages(urls, handler, concurrency=16, per_host=4, delay=0.0, store=None, governor=None):
+    async def _run():
+        async with AsyncFetcher(concurrency=concurrency, per_host=per_host, delay=delay, store=store,
+                                governor=governor) as fetcher:
+            return await fetcher.run(urls, handler)
+
+    return asyncio.run(_run())
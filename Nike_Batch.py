@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import csv
+import json
+from urllib.parse import quote_plus
+
+from Nike_Async_Fetcher import AsyncFetcher
+from Nike_Frontier import DEFAULT_REGION, Frontier, storefront
+from Nike_Metrics import metrics
+from Nike_Parsers import get_parser
+from Nike_Price_Alerts import alert_stream
+from Nike_Price_History import PriceHistory
+from Nike_Record_Sink import RecordSink
+from Nike_Web_Crawler_Beaut import COLUMNS as PRODUCT_COLUMNS, extract_product
+
+COLUMNS = ["Query"] + PRODUCT_COLUMNS
+
+# Manifest category fields and the output columns they fill
+CATEGORY_FIELDS = {"category": "Category", "subcategory": "Subcategory", "sub_subcategory": "Sub-subcategory"}
+
+
+# Read a CSV or JSONL manifest. Each entry has a `query` (searched on Nike) or a product `url`,
+# optionally `category`, `subcategory`, `sub_subcategory` and, for queries, a `limit` on how
+# many search results to take (default: the whole first results page).
+def read_manifest(path):
+    with open(path, encoding='utf-8-sig') as f:
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    entries = []
+    for number, row in enumerate(rows, 1):
+        entry = {key.strip().lower(): value.strip() if isinstance(value, str) else value
+                 for key, value in row.items() if key and value not in (None, '')}
+        if not entry.get('query') and not entry.get('url'):
+            print(f"Skipping manifest row {number}: needs a query or a url")
+            continue
+        if entry.get('limit') is not None:
+            entry['limit'] = int(entry['limit'])
+        entries.append(entry)
+    return entries
+
+
+def search_url(query, region=DEFAULT_REGION):
+    return f"{storefront(region)}/w?q={quote_plus(query)}"
+
+
+# Output row for a product: manifest categories win, breadcrumbs fill in the rest
+def batch_row(entry, data):
+    row = dict(data, Query=entry.get('query', ''))
+    for field, column in CATEGORY_FIELDS.items():
+        if entry.get(field):
+            row[column] = entry[field]
+    return row
+
+
+def _complete(data):
+    return data['Name'] != 'N/A' and data['Price'] != 'N/A'
+
+
+# Resolve every query to product URLs and scrape them all through one fetcher (one connection
+# pool, one rate governor). Returns {url: manifest entry} for every product, the URLs whose page
+# loaded without a name or price, and the URLs that could not be fetched (both still need a
+# browser), calling write(entry, data) for each product scraped over HTTP.
+async def _crawl_http(entries, write, concurrency, per_host):
+    parser = get_parser()
+    frontier = Frontier()
+    targets = {}
+    missing = []
+
+    # Explicit URLs first, so their manifest categories win over a query that also finds them
+    for entry in entries:
+        if entry.get('url'):
+            link = frontier.add(entry['url'])
+            if link is not None:
+                targets[link] = entry
+    searches = {search_url(entry['query']): entry for entry in entries if entry.get('query')}
+
+    def handle_search(url, html):
+        entry = searches[url]
+        cards = parser.parse_cards(html)
+        for _, _, href in cards[:entry.get('limit')]:
+            link = frontier.add(href)
+            if link is not None:
+                targets[link] = entry
+        print(f"{entry['query']!r}: {len(cards)} results")
+
+    def handle_product(url, html):
+        data = extract_product(url, html, parser)
+        if _complete(data):
+            write(targets[url], data)
+        else:
+            missing.append(url)
+
+    async with AsyncFetcher(concurrency=concurrency, per_host=per_host) as fetcher:
+        for url in await fetcher.run(list(searches), handle_search):
+            print(f"Search failed for {searches[url]['query']!r}")
+        failed = await fetcher.run(list(targets), handle_product)
+    return targets, missing, failed
+
+
+# Browser fallback for pages whose name or price only appear after rendering
+def scrape_in_browser(browser, url):
+    from Nike_Lean_Browser import FieldsMissing, read_fields
+
+    browser.get(url)
+    data = extract_product(url, browser.page_source)
+    if not _complete(data):
+        try:
+            read_fields(browser)
+        except FieldsMissing as e:
+            print(f"Not on the rendered page either: {url} ({e})")
+            return data
+        data = extract_product(url, browser.page_source)
+    return data
+
+
+# Run a whole manifest without prompts: every query and URL goes through one warm HTTP
+# session, pages that need rendering share one browser pool, and every product lands in
+# a single output file (CSV or Parquet by extension) and, optionally, the price history
+# and a PriceChangeDetector that streams price changes as products arrive. A product counts
+# towards being delisted when its page loaded without it: rendered in the browser, or over
+# HTTP when the browser is off. Downloads and renders that failed are not counted.
+def run_batch(entries, output='batch_prices.csv', history=None, concurrency=16, per_host=4, pool_size=4,
+              use_browser=True, alerts=None):
+    sink = RecordSink(output, COLUMNS, encoding='utf-8-sig')
+    scraped = 0
+
+    def write(entry, data):
+        nonlocal scraped
+        row = batch_row(entry, data)
+        sink.write(row)
+        if history is not None:
+            history.append(row["Product"], row["Price"], name=row["Name"], category=row["Category"] or None)
+        if alerts is not None:
+            alerts.observe(row["Product"], row["Price"], name=row["Name"])
+        scraped += 1
+
+    targets, missing, failed = asyncio.run(_crawl_http(entries, write, concurrency, per_host))
+
+    absent = missing
+    if (missing or failed) and use_browser:
+        from Nike_Browser_Pool import BrowserPool
+        from Nike_Lean_Browser import block_resources, lean_options
+
+        print(f"Rendering {len(missing) + len(failed)} pages in the browser pool")
+        pool = BrowserPool(size=pool_size, options_factory=lean_options, setup=block_resources)
+        absent = []
+        for data in pool.map(scrape_in_browser, missing + failed):
+            if data and _complete(data):
+                write(targets[data["Product"]], data)
+            elif data:
+                absent.append(data["Product"])
+    if alerts is not None:
+        for url in absent:
+            alerts.missed(url)
+
+    sink.close()
+    if history is not None:
+        history.flush()
+    print(f"Scraped {scraped} of {len(targets)} products into {sink.path}")
+    metrics.report()
+    return sink
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape every query and product URL in a manifest, without prompts")
+    parser.add_argument("manifest", help="CSV or JSONL with query/url and optional category, subcategory, "
+                                         "sub_subcategory, limit")
+    parser.add_argument("--output", default="batch_prices.csv", help="consolidated output (.csv or .parquet)")
+    parser.add_argument("--history", help="also append to this price history directory")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4, help="browsers for pages that need rendering")
+    parser.add_argument("--no-browser", action="store_true", help="skip pages that cannot be read over plain HTTP")
+    parser.add_argument("--alerts", help="stream price changes against the last run to this JSONL file")
+    parser.add_argument("--webhook", help="also post each price change to this URL")
+    args = parser.parse_args()
+
+    entries = read_manifest(args.manifest)
+    history = PriceHistory(args.history) if args.history else None
+    alerts = alert_stream(args.alerts, args.webhook) if args.alerts or args.webhook else None
+    run_batch(entries, output=args.output, history=history, concurrency=args.concurrency, per_host=args.per_host,
+              pool_size=args.pool_size, use_browser=not args.no_browser, alerts=alerts)
+    if alerts is not None:
+        alerts.close()
+
+
+if __name__ == "__main__":
+    main()
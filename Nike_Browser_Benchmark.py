@@ -0,0 +1,74 @@
+import argparse
+import statistics
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from chromedriver_py import binary_path
+
+from Nike_Browser_Pool import headless_options
+from Nike_Lean_Browser import FieldsMissing, block_resources, lean_options, read_fields, timed
+
+NAME = (By.XPATH, '//h1[contains(@class, "headline-5")] | //h1[@data-testid="product_title"] | //h1[contains(@class, "headline")]')
+PRICE = (By.XPATH, '//div[@data-test="product-price"] | //*[@data-testid="currentPrice-container"]')
+
+DEFAULT_URLS = [
+    'https://www.nike.com/gb/t/dunk-low-retro-shoe-Kd1wZr/DD1391-103',
+    'https://www.nike.com/gb/t/air-max-95-shoes-4h4CP9/FQ1235-002',
+]
+
+
+# Old behaviour: full page load, then one 20-second wait per field in turn
+def scrape_default(browser, url):
+    browser.get(url)
+    try:
+        WebDriverWait(browser, 20).until(EC.presence_of_element_located(PRICE))
+        WebDriverWait(browser, 20).until(EC.presence_of_element_located(NAME))
+        return True
+    except TimeoutException:
+        return False
+
+
+# Lean behaviour, as the crawlers run it: eager load, blocked resources, and read_fields
+# trying every fallback selector against one page snapshot at a time
+def scrape_lean(browser, url):
+    browser.get(url)
+    try:
+        read_fields(browser, timeout=20)
+        return True
+    except (FieldsMissing, TimeoutException):
+        return False
+
+
+def run(profile, options, setup, scrape, urls, rounds):
+    browser = webdriver.Chrome(service=Service(executable_path=binary_path), options=options)
+    if setup:
+        setup(browser)
+    latencies, found = [], 0
+    try:
+        for _ in range(rounds):
+            for url in urls:
+                ok, seconds = timed(scrape, browser, url)
+                latencies.append(seconds)
+                found += ok
+    finally:
+        browser.quit()
+    print(f"{profile:<8} {len(latencies)} pages  mean {statistics.mean(latencies):.2f}s  "
+          f"p50 {statistics.median(latencies):.2f}s  max {max(latencies):.2f}s  fields found on {found}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page latency of the default vs lean Selenium profile")
+    parser.add_argument("urls", nargs="*", default=DEFAULT_URLS)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    run("default", headless_options(), None, scrape_default, args.urls, args.rounds)
+    run("lean", lean_options(), block_resources, scrape_lean, args.urls, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import functools
+import json
+import os
+import queue
+import threading
+import time
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from chromedriver_py import binary_path
+
+from Nike_Metrics import metrics
+from Nike_Rate_Governor import RateGovernor, governed_call
+
+_DONE = object()
+
+DRIVER_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'nike_crawler', 'chromedriver.json')
+
+
+# Default Chrome options for pool workers
+def headless_options():
+    options = Options()
+    options.add_argument("--headless")  # Run in headless mode (no GUI)
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return options
+
+
+# Version of the installed Chrome as webdriver-manager reads it from the OS (no network), or None
+def chrome_version():
+    try:
+        from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+    except ImportError:
+        return None
+    try:
+        return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception:  # an unusual install; fall back to the age check alone
+        return None
+
+
+# Path to a chromedriver matching the installed Chrome, resolved once and remembered.
+# CHROMEDRIVER wins. Otherwise the path an earlier run resolved is reused while it still exists,
+# is younger than max_age and was resolved for the Chrome version installed now (Chrome updates
+# itself several times a month). Only then is webdriver-manager asked, which costs a network round
+# trip on every call. chromedriver_py's bundled binary is the fallback when it is not installed.
+@functools.cache
+def resolve_driver(max_age=7 * 86400, cache_path=DRIVER_CACHE):
+    if os.environ.get('CHROMEDRIVER'):
+        return os.environ['CHROMEDRIVER']
+    version = chrome_version()
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        if os.path.exists(cached['path']) and time.time() - cached['resolved'] < max_age \
+                and cached.get('chrome') == version:
+            return cached['path']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+    except ImportError:
+        return binary_path
+    with metrics.stage('driver_resolve'):
+        path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({'path': path, 'resolved': time.time(), 'chrome': version}, f)
+    return path
+
+
+# The cached driver could not start a session (Chrome was updated to a version it does not
+# match): drop it, so the next resolve_driver() asks webdriver-manager again
+def forget_driver(cache_path=DRIVER_CACHE):
+    resolve_driver.cache_clear()
+    try:
+        os.remove(cache_path)
+    except FileNotFoundError:
+        pass
+
+
+# A fixed set of long-lived headless Chrome workers fed from one shared work queue.
+# Each worker reuses its browser across URLs, and replaces it after max_pages pages
+# or as soon as the driver crashes. Page loads go through a RateGovernor, so a
+# throttling episode shrinks how many browsers load at once and timed-out pages
+# are retried with backoff instead of being dropped.
+class BrowserPool:
+    def __init__(self, size=4, max_pages=50, max_retries=1, driver_path=binary_path, options_factory=headless_options,
+                 setup=None, governor=None):
+        self.governor = governor or RateGovernor(initial=size, maximum=size, name='browser')
+        self.setup = setup
+        self.size = size
+        self.max_pages = max_pages
+        self.max_retries = max_retries
+        self.driver_path = driver_path
+        self.options_factory = options_factory
+
+    def _new_browser(self):
+        browser = webdriver.Chrome(service=Service(executable_path=self.driver_path), options=self.options_factory())
+        if self.setup:
+            self.setup(browser)  # e.g. DevTools resource blocking
+        return browser
+
+    @staticmethod
+    def _quit(browser):
+        try:
+            browser.quit()
+        except WebDriverException:
+            pass
+
+    def _worker(self, scrape, work, results):
+        browser = None
+        pages = 0
+        while True:
+            item = work.get()
+            if item is _DONE:
+                break
+            url, attempt = item
+            try:
+                if browser is None:
+                    with metrics.stage('browser_start'):
+                        browser = self._new_browser()
+                    pages = 0
+                with metrics.stage('browser_page'):
+                    result = governed_call(url, lambda: scrape(browser, url), TimeoutException, self.governor)
+                results.put(result)
+                pages += 1
+            except TimeoutException as e:
+                print(f"Timed out fetching {url}: {e}")
+                metrics.count('timeouts', source='browser')
+                results.put(None)
+                pages += 1
+            except WebDriverException as e:
+                # The browser is in an unknown state, so throw it away and start a fresh one
+                print(f"Browser crashed on {url}, recycling worker: {e}")
+                metrics.count('browser_crashes')
+                if browser is not None:
+                    self._quit(browser)
+                    browser = None
+                if attempt < self.max_retries:
+                    metrics.count('retries', source='browser')
+                    work.put((url, attempt + 1))
+                else:
+                    results.put(None)
+                continue
+            except Exception as e:
+                print(f"Error fetching data for {url}: {e}")
+                metrics.count('scrape_errors', source='browser')
+                results.put(None)
+                pages += 1
+            if browser is not None and pages >= self.max_pages:
+                self._quit(browser)
+                browser = None
+        if browser is not None:
+            self._quit(browser)
+
+    # Run scrape(browser, url) over every URL and yield the results as workers finish them.
+    # The workers and their browsers are shut down however iteration ends: exhausted, broken
+    # off early, or interrupted by an exception in the consumer.
+    def map(self, scrape, urls):
+        work = queue.Queue()
+        results = queue.Queue()
+        urls = list(urls)
+        for url in urls:
+            work.put((url, 0))
+
+        workers = max(1, min(self.size, len(urls)))
+        threads = [threading.Thread(target=self._worker, args=(scrape, work, results), daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            remaining = len(urls)
+            while remaining:
+                remaining -= 1
+                yield results.get()
+        finally:
+            # Drop the pages not started yet, so each worker quits its browser after its current one
+            while True:
+                try:
+                    work.get_nowait()
+                except queue.Empty:
+                    break
+            for _ in threads:
+                work.put(_DONE)
+            for thread in threads:
+                thread.join()
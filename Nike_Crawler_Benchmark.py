@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+from urllib.parse import parse_qs, urlsplit
+
+from Nike_Fixtures import FIXTURES_DIR, ArrivalLog, FixtureArchive, ReplayServer, fixture_key, local_url, seed_sample
+
+MODES = ['state', 'beaut', 'updated', 'sel']
+
+
+# Times each parse call: CPU spent in the parsing thread, and latency from the request
+# reaching the stand-in until the parse returned
+class Stats:
+    def __init__(self, log):
+        self.log = log
+        self.latencies = []
+        self.parse_cpu = 0.0
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def parsed(self, key, parse, *args):
+        start = time.thread_time()
+        result = parse(*args)
+        cpu = time.thread_time() - start
+        latency = self.log.done(key)
+        with self._lock:
+            self.parse_cpu += cpu
+            self.pages += 1
+            if latency is not None:
+                self.latencies.append(latency)
+        return result
+
+
+# Nike_Web_Crawler.py: plain HTTP, product read from the embedded JSON state
+def run_state(base, archive, stats, rounds, concurrency):
+    from Nike_Async_Fetcher import fetch_pages
+    from Nike_State_Extractor import extract_state
+
+    urls = [local_url(base, url) for url in archive.urls('product')] * rounds
+    return lambda: fetch_pages(urls, lambda url, html: stats.parsed(fixture_key(url), extract_state, html, url),
+                               concurrency=concurrency, per_host=concurrency)
+
+
+# Nike_Web_Crawler_Beaut.py: concurrent product pages through extract_product
+def run_beaut(base, archive, stats, rounds, concurrency):
+    from Nike_Async_Fetcher import fetch_pages
+    from Nike_Web_Crawler_Beaut import extract_product
+
+    urls = [local_url(base, url) for url in archive.urls('product')] * rounds
+    return lambda: fetch_pages(urls, lambda url, html: stats.parsed(fixture_key(url), extract_product, url, html),
+                               concurrency=concurrency, per_host=concurrency)
+
+
+# Nike_web_crawler_updated.py: windowed search-page harvest with the card parser
+def run_updated(base, archive, stats, rounds, concurrency):
+    from Nike_Frontier import product_key
+    from Nike_Search_Harvester import harvest
+    from Nike_web_crawler_updated import generate_nike_url, parse
+
+    terms = list(dict.fromkeys(parse_qs(urlsplit(url).query).get('q', [''])[0] for url in archive.urls('search')))
+
+    def crawl(term):
+        requested = deque()  # harvest parses pages in the order it asked for them
+
+        def url_for(page):
+            url = local_url(base, generate_nike_url(term, page))
+            requested.append(fixture_key(url))
+            return url
+
+        for _ in harvest(url_for, lambda html: stats.parsed(requested.popleft(), parse, html),
+                         key=lambda product: product_key(product['Link']), concurrency=concurrency, per_host=concurrency):
+            pass
+
+    return lambda: [crawl(term) for _ in range(rounds) for term in terms]
+
+
+# Nike_Web_Crawler_Sel.py: browser pool with the lean profile (needs Chrome installed)
+def run_sel(base, archive, stats, rounds, concurrency):
+    from Nike_Browser_Pool import BrowserPool
+    from Nike_Lean_Browser import block_resources, lean_options
+    from Nike_Web_Crawler_Sel import scrape_product_data
+
+    urls = [local_url(base, url) for url in archive.urls('product')] * rounds
+    pool = BrowserPool(size=concurrency, options_factory=lean_options, setup=block_resources)
+    return lambda: list(pool.map(lambda browser, url: stats.parsed(fixture_key(url), scrape_product_data, browser, url), urls))
+
+
+# Each runner prepares one crawler mode and returns the crawl to time
+RUNNERS = {'state': run_state, 'beaut': run_beaut, 'updated': run_updated, 'sel': run_sel}
+
+
+# High-water resident set size of this process in MB
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+# Run one crawler mode against its own stand-in. Called in a fresh process per mode so
+# that peak RSS belongs to that mode alone; module imports happen before the clock starts.
+# Crawler output is silenced, so a mode that crawled nothing reports 0 pages.
+def run_mode(mode, root, latency, rounds, concurrency):
+    archive = FixtureArchive(root)
+    log = ArrivalLog()
+    server = ReplayServer(archive, latency=latency, on_request=log).start()
+    stats = Stats(log)
+    try:
+        with open(os.devnull, 'w') as quiet, redirect_stdout(quiet):
+            crawl = RUNNERS[mode](server.base_url, archive, stats, rounds, concurrency)
+            start = time.perf_counter()
+            crawl()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    return {
+        'mode': mode,
+        'pages': stats.pages,
+        'seconds': elapsed,
+        'pages_per_sec': stats.pages / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(stats.latencies, 50) * 1000,
+        'p99_ms': percentile(stats.latencies, 99) * 1000,
+        'parse_cpu_ms_per_page': stats.parse_cpu / stats.pages * 1000 if stats.pages else float('nan'),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each crawler mode offline against recorded fixtures")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="fixture archive (see Nike_Fixtures.py)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=['state', 'beaut', 'updated'],
+                        help="'sel' also needs a local Chrome")
+    parser.add_argument("--rounds", type=int, default=3, help="times each recorded page is crawled")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated server latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--json", help="also write the results to this file, for comparing runs")
+    args = parser.parse_args()
+
+    archive = FixtureArchive(args.fixtures)
+    if not len(archive):
+        print(f"No fixtures in {args.fixtures}, writing synthetic sample pages")
+        seed_sample(archive)
+
+    results = []
+    print(f"{'mode':<8} {'pages':>6} {'pages/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'parse ms/pg':>11} {'peak MB':>8}")
+    for mode in args.modes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            try:
+                result = executor.submit(run_mode, mode, args.fixtures, args.latency, args.rounds,
+                                         args.concurrency).result()
+            except Exception as e:
+                print(f"{mode:<8} failed: {e}")
+                continue
+        results.append(result)
+        print(f"{mode:<8} {result['pages']:>6} {result['pages_per_sec']:>8.1f} {result['p50_ms']:>8.1f} "
+              f"{result['p99_ms']:>8.1f} {result['parse_cpu_ms_per_page']:>11.2f} {result['peak_rss_mb']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
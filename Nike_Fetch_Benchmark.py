@@ -0,0 +1,91 @@
+import argparse
+import glob
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from Nike_Async_Fetcher import fetch_pages
+from Nike_Web_Crawler_Beaut import extract_product
+
+# Minimal product page used when no saved Nike pages are supplied
+SAMPLE_PAGE = """<html><body>
+<nav aria-label="Breadcrumbs"><ol><li><a href="#">Men</a></li><li><a href="#">Shoes</a></li><li><a href="#">Lifestyle</a></li></ol></nav>
+<h1 class="headline">Nike Dunk Low Retro</h1>
+<div data-test="product-price">£99.99</div>
+</body></html>"""
+
+
+# Static file handler that simulates network latency and stays quiet
+class SlowHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve a directory of saved pages on localhost in a background thread
+def start_server(pages_dir, latency):
+    handler = type("Handler", (SlowHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=pages_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Make sure there is something to serve and return the page file names
+def prepare_pages(pages_dir):
+    pages = sorted(os.path.basename(p) for p in glob.glob(os.path.join(pages_dir, "*.html")))
+    if not pages:
+        os.makedirs(pages_dir, exist_ok=True)
+        with open(os.path.join(pages_dir, "sample.html"), "w", encoding="utf-8") as f:
+            f.write(SAMPLE_PAGE)
+        pages = ["sample.html"]
+    return pages
+
+
+# The current crawler path: one blocking requests.get after another
+def run_sequential(urls):
+    for url in urls:
+        response = requests.get(url)
+        response.raise_for_status()
+        extract_product(url, response.text)
+
+
+def run_concurrent(urls, concurrency, per_host):
+    fetch_pages(urls, extract_product, concurrency=concurrency, per_host=per_host)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and concurrent product page fetching")
+    parser.add_argument("--pages", default="saved_pages", help="directory of saved Nike product pages (*.html)")
+    parser.add_argument("--count", type=int, default=60, help="number of page requests per mode")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated server latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=16)
+    args = parser.parse_args()
+
+    pages = prepare_pages(args.pages)
+    server = start_server(args.pages, args.latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}/"
+    urls = [base + pages[i % len(pages)] for i in range(args.count)]
+
+    for mode, run in (("sequential", lambda: run_sequential(urls)),
+                      ("concurrent", lambda: run_concurrent(urls, args.concurrency, args.per_host))):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<11} {len(urls)} pages in {elapsed:.2f}s ({len(urls) / elapsed:.1f} pages/sec)")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
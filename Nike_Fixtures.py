@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from Nike_Async_Fetcher import DEFAULT_HEADERS, fetch_pages
+from Nike_Frontier import Frontier, NIKE_ORIGIN
+from Nike_Parsers import get_parser
+from Nike_Rate_Governor import governed_get
+
+FIXTURES_DIR = 'fixtures'
+
+
+# What the stand-in serves a request for: path plus query, e.g. /gb/w?q=dunk+low&page=2
+def fixture_key(url):
+    parts = urlsplit(url)
+    return parts.path + ('?' + parts.query if parts.query else '')
+
+
+# Point a recorded nike.com URL at the local stand-in instead
+def local_url(base, url):
+    return base.rstrip('/') + fixture_key(url)
+
+
+# Local archive of recorded responses: <root>/index.json maps each request key to its
+# body file, kind ('search' or 'product'), status and content type. Bodies are stored
+# once per distinct content, so re-recording an unchanged page costs nothing.
+class FixtureArchive:
+    def __init__(self, root=FIXTURES_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def add(self, url, body, kind='product', status=200, content_type='text/html; charset=utf-8'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        name = hashlib.blake2b(body, digest_size=10).hexdigest() + '.html'
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            os.makedirs(self.root, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(body)
+        self.index[fixture_key(url)] = {'url': url, 'kind': kind, 'file': name,
+                                        'status': status, 'content_type': content_type}
+
+    # Returns (entry, body bytes), or (None, None) when the request was never recorded
+    def get(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None, None
+        with open(os.path.join(self.root, entry['file']), 'rb') as f:
+            return entry, f.read()
+
+    # Recorded URLs of one kind, in recording order
+    def urls(self, kind=None):
+        return [entry['url'] for entry in self.index.values() if kind is None or entry['kind'] == kind]
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1)
+
+    def __len__(self):
+        return len(self.index)
+
+
+# Record search result pages and the product pages they link to from the live site.
+# Search pages are fetched one by one, product pages through the concurrent fetcher.
+def record(archive, search_terms, pages=2, products=50, concurrency=8, per_host=4):
+    frontier = Frontier()
+    product_urls = []
+    parser = get_parser()
+    for term in search_terms:
+        for page in range(1, pages + 1):
+            url = f'{NIKE_ORIGIN}/gb/w?q={term.replace(" ", "+")}&page={page}'
+            response = governed_get(url, headers=DEFAULT_HEADERS)
+            response.raise_for_status()
+            archive.add(url, response.content, kind='search')
+            cards = parser.parse_cards(response.text)
+            print(f"Recorded {url} ({len(cards)} cards)")
+            for _, _, href in cards:
+                link = frontier.add(href)
+                if link is not None and len(product_urls) < products:
+                    product_urls.append(link)
+            if not cards:
+                break
+
+    failed = fetch_pages(product_urls, lambda url, html: archive.add(url, html, kind='product'),
+                         concurrency=concurrency, per_host=per_host)
+    archive.save()
+    print(f"Recorded {len(product_urls) - len(failed)} product pages into {archive.root} ({len(failed)} failed)")
+    return archive
+
+
+# Synthetic search and product pages in Nike's markup, for when nothing has been recorded yet.
+# Product pages carry both the embedded __NEXT_DATA__ state and the rendered fields, padded
+# with filler markup to roughly page_kb so parsing cost is in the right ballpark.
+def seed_sample(archive, products=48, cards_per_page=24, page_kb=200):
+    filler_row = '<div class="css-filler"><span>Free delivery and returns</span><p>Lorem ipsum dolor sit amet</p></div>\n'
+    filler = filler_row * (page_kb * 1024 // len(filler_row))
+    product_urls = []
+    for i in range(products):
+        code = f'SM{i:04d}-{i % 1000:03d}'
+        url = f'{NIKE_ORIGIN}/gb/t/sample-shoe-{i}/{code}'
+        name = f'Nike Sample Shoe {i}'
+        full = 80 + i % 60
+        current = full if i % 3 else round(full * 0.7, 2)
+        state = {'props': {'pageProps': {'product': {
+            'styleColor': code, 'fullTitle': name, 'currency': 'GBP',
+            'prices': {'currentPrice': current, 'initialPrice': full},
+            'breadcrumbs': [{'label': 'Men'}, {'label': 'Shoes'}, {'label': 'Lifestyle'}]}}}}
+        html = (f'<html><head><script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script></head><body>\n'
+                f'<nav aria-label="Breadcrumbs"><ol><li><a href="#">Men</a></li><li><a href="#">Shoes</a></li>'
+                f'<li><a href="#">Lifestyle</a></li></ol></nav>\n'
+                f'<h1 class="headline headline-5">{name}</h1>\n<div data-test="product-price">£{current:.2f}</div>\n'
+                f'{filler}</body></html>')
+        archive.add(url, html, kind='product')
+        product_urls.append((url, name, current))
+
+    for page, start in enumerate(range(0, products, cards_per_page), 1):
+        cards = ''.join(
+            f'<div class="product-card__body"><a class="product-card__link-overlay" href="{url}"></a>'
+            f'<div class="product-card__title">{name}</div><div class="product-price">£{price:.2f}</div></div>\n'
+            for url, name, price in product_urls[start:start + cards_per_page])
+        archive.add(f'{NIKE_ORIGIN}/gb/w?q=sample&page={page}', f'<html><body>{cards}{filler}</body></html>', kind='search')
+    archive.save()
+    return archive
+
+
+# Serves recorded responses by path and query. Unrecorded requests get a 404, which the
+# crawlers treat as a failed page. on_request(key), when set, sees every request as it arrives.
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        if server.on_request:
+            server.on_request(self.path)
+        if server.latency:
+            time.sleep(server.latency)
+        entry, body = server.archive.get(self.path)
+        if entry is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(entry['status'])
+        self.send_header('Content-Type', entry['content_type'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Local HTTP stand-in for nike.com, running in a background thread
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, archive, latency=0.0, host='127.0.0.1', port=0, on_request=None):
+        super().__init__((host, port), ReplayHandler)
+        self.archive = archive
+        self.latency = latency
+        self.on_request = on_request
+
+    @property
+    def base_url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# Arrival times at the stand-in, so a benchmark can measure per-page latency from the moment
+# the request reached the "site" until the crawler finished parsing that page
+class ArrivalLog:
+    def __init__(self):
+        self._arrivals = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        with self._lock:
+            self._arrivals[key].append(time.perf_counter())
+
+    def done(self, key):
+        with self._lock:
+            arrivals = self._arrivals.get(key)
+            started = arrivals.popleft() if arrivals else None
+        return time.perf_counter() - started if started is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record Nike pages into a fixture archive and replay them locally")
+    parser.add_argument("--root", default=FIXTURES_DIR, help="fixture archive directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="record search and product pages from nike.com")
+    rec.add_argument("terms", nargs="+", help="search terms, e.g. 'dunk low'")
+    rec.add_argument("--pages", type=int, default=2, help="search result pages per term")
+    rec.add_argument("--products", type=int, default=50, help="product pages to record in total")
+
+    seed = commands.add_parser("seed", help="write synthetic sample pages instead of recording")
+    seed.add_argument("--products", type=int, default=48)
+    seed.add_argument("--page-kb", type=int, default=200)
+
+    serve = commands.add_parser("serve", help="serve the archive as a local stand-in for nike.com")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--latency", type=float, default=0.0, help="simulated server latency in seconds")
+    args = parser.parse_args()
+
+    archive = FixtureArchive(args.root)
+    if args.command == "record":
+        record(archive, args.terms, pages=args.pages, products=args.products)
+    elif args.command == "seed":
+        seed_sample(archive, products=args.products, page_kb=args.page_kb)
+        print(f"Wrote {len(archive)} sample pages into {archive.root}")
+    else:
+        server = ReplayServer(archive, latency=args.latency, port=args.port)
+        print(f"Replaying {len(archive)} recorded pages at {server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import hashlib
+import math
+import re
+from urllib.parse import urlsplit, urlunsplit
+
+NIKE_ORIGIN = 'https://www.nike.com'
+STYLE_CODE_RE = re.compile(r'\b([A-Z0-9]{6}-[0-9]{3})\b')
+_REPEATED_ORIGIN_RE = re.compile(r'^(?:https?://(?:www\.)?nike\.com)+', re.I)
+_REGION_RE = re.compile(r'^/([a-z]{2})(?=/)')
+
+DEFAULT_REGION = 'gb'
+
+# Storefront path segment and the currency it prices in
+REGION_CURRENCIES = {
+    'gb': 'GBP', 'us': 'USD', 'ca': 'CAD', 'au': 'AUD', 'jp': 'JPY',
+    'fr': 'EUR', 'de': 'EUR', 'nl': 'EUR', 'it': 'EUR', 'es': 'EUR', 'ie': 'EUR',
+}
+
+
+# Normalise a Nike product URL: absolute https on www.nike.com, no doubled
+# origin (https://www.nike.comhttps://www.nike.com/...), query, fragment or trailing slash.
+# Other hosts (e.g. a local replay server) keep their own scheme.
+def canonicalize_url(url):
+    url = url.strip()
+    if _REPEATED_ORIGIN_RE.match(url):
+        url = _REPEATED_ORIGIN_RE.sub(NIKE_ORIGIN, url, count=1)
+    elif url.startswith('/'):
+        url = NIKE_ORIGIN + url
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') or '/'
+    netloc = parts.netloc.lower()
+    scheme = 'https' if netloc.endswith('nike.com') else (parts.scheme or 'https')
+    return urlunsplit((scheme, netloc, path, '', ''))
+
+
+# Pull the style code (e.g. DD1391-103) out of a product URL
+def style_code(url):
+    match = STYLE_CODE_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+# Identity of a product for deduplication: its style code, or the canonical URL when it has none
+def product_key(url):
+    return style_code(url) or canonicalize_url(url)
+
+
+# Storefront a Nike URL belongs to, from its leading path segment ('gb', 'fr', ...).
+# The US storefront has no segment (https://www.nike.com/t/...).
+def region_of(url):
+    match = _REGION_RE.match(urlsplit(url).path)
+    return match.group(1) if match else 'us'
+
+
+# Root of a storefront, e.g. https://www.nike.com/fr
+def storefront(region=DEFAULT_REGION):
+    return NIKE_ORIGIN if region == 'us' else f'{NIKE_ORIGIN}/{region}'
+
+
+# Canonical URL of the same product on another storefront: only the region segment changes
+def regional_url(url, region):
+    parts = urlsplit(canonicalize_url(url))
+    path = _REGION_RE.sub('', parts.path)
+    prefix = '' if region == 'us' else f'/{region}'
+    return urlunsplit((parts.scheme, parts.netloc, prefix + path, '', ''))
+
+
+# Identity of a product in one storefront, for crawls that fetch the same style code in several regions
+def regional_key(url):
+    return f'{region_of(url)}:{product_key(url)}'
+
+
+# Fixed-size Bloom filter for very large crawls: memory is set up front from the
+# expected item count and false-positive rate, and never grows
+class BloomFilter:
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+
+# URL frontier for one crawl run: canonicalises every URL and lets each style
+# code through once. Uses an exact set by default, or a Bloom filter when
+# given a capacity, for crawls too large to keep every key in memory.
+# key=regional_key lets each style code through once per storefront instead.
+class Frontier:
+    def __init__(self, capacity=None, error_rate=0.001, key=product_key):
+        self.seen = BloomFilter(capacity, error_rate) if capacity else set()
+        self.key = key
+
+    # Returns the canonical URL the first time a product is offered, None after that
+    def add(self, url):
+        url = canonicalize_url(url)
+        key = self.key(url)
+        if key in self.seen:
+            return None
+        self.seen.add(key)
+        return url
+
+    # Yield the canonical form of each URL not already in the frontier
+    def filter(self, urls):
+        for url in urls:
+            url = self.add(url)
+            if url:
+                yield url
+
+    def __contains__(self, url):
+        return self.key(canonicalize_url(url)) in self.seen
+
+    def __len__(self):
+        return len(self.seen)
@@ -0,0 +1,73 @@
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+from Nike_Browser_Pool import headless_options
+from Nike_Metrics import metrics
+from Nike_Parsers import count_fields, get_parser
+
+# Heavy resources and third-party trackers that a price scrape never needs
+BLOCKED_URLS = [
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.m3u8',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*hotjar.com*', '*optimizely.com*', '*qualtrics.com*',
+    '*tiktok.com*', '*snapchat.com*', '*pinterest.com*', '*adobedtm.com*',
+]
+
+
+# Headless Chrome that returns from get() at DOMContentLoaded and never downloads images
+def lean_options():
+    options = headless_options()
+    options.page_load_strategy = 'eager'
+    options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    return options
+
+
+# Block heavy resource types and trackers at the network layer via the DevTools protocol
+def block_resources(browser, patterns=None):
+    browser.execute_cdp_cmd('Network.enable', {})
+    browser.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns or BLOCKED_URLS})
+    return browser
+
+
+class FieldsMissing(Exception):
+    pass
+
+
+# Read the PDP fields from page snapshots with the fallback chains in Nike_Parsers, instead of
+# waiting on one locator per field. Each snapshot is parsed once and every fallback is tried
+# against it. Returns the parse_pdp result (name, price, categories, and which fallback matched)
+# as soon as name and price are both there. Once the document has finished loading, one more
+# snapshot is allowed for late rendering; if a field is still absent, FieldsMissing is raised
+# straight away. TimeoutException means the page itself never finished loading within timeout.
+# Only the snapshot the result comes from is counted in selector_fallback/selector_misses.
+def read_fields(browser, timeout=20, poll=0.1, parser=None):
+    parser = parser or get_parser()
+    deadline = time.monotonic() + timeout
+    loaded = False
+    with metrics.stage('browser_wait', step='fields'):
+        while True:
+            settled = loaded
+            loaded = browser.execute_script('return document.readyState') == 'complete'
+            fields = parser.parse_pdp(browser.page_source, count=False)
+            if fields['name'] and fields['price']:
+                count_fields(parser.name, fields)
+                return fields
+            if settled:
+                count_fields(parser.name, fields)
+                missing = [field for field in ('name', 'price') if not fields[field]]
+                raise FieldsMissing(f"{', '.join(missing)} not on the loaded page")
+            if time.monotonic() >= deadline:
+                metrics.count('selector_misses', selector='pdp_fields', source='browser')
+                raise TimeoutException(f"page did not finish loading within {timeout}s")
+            time.sleep(poll)
+
+
+# Load a page and return (result, seconds) so per-page latency can be compared across profiles
+def timed(scrape, browser, url):
+    start = time.perf_counter()
+    result = scrape(browser, url)
+    return result, time.perf_counter() - start
@@ -0,0 +1,165 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = 'nike'
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _label_text(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+# Per-stage timings and event counters for the crawlers, exported three ways:
+#   - structured JSON log lines, one per timed stage or counted event (log_path, '-' for stderr)
+#   - a Prometheus text file, rewritten atomically by report() (prom_path)
+#   - a Prometheus /metrics HTTP endpoint in a background thread (port)
+# Stages: connect (DNS + TCP/TLS), download, browser_load, browser_wait, parse, normalize, sink_write.
+# Counters: retries, timeouts, fetch_errors, selector_misses, http_responses, ...
+# Gauges: concurrency_limit (the rate governors' current window)
+class Metrics:
+    def __init__(self, log_path=None, prom_path=None, port=None):
+        self._lock = threading.Lock()
+        self._stages = {}    # (stage, labels) -> [bucket counts..., count, sum]
+        self._counters = {}  # (name, labels) -> value
+        self._gauges = {}    # (name, labels) -> latest value
+        self._log = None
+        self.prom_path = prom_path
+        self.server = None
+        if log_path:
+            self._log = sys.stderr if log_path == '-' else open(log_path, 'a', encoding='utf-8', buffering=1)
+        if port:
+            self.serve(port)
+
+    # Configure from NIKE_METRICS_LOG, NIKE_METRICS_FILE and NIKE_METRICS_PORT
+    @classmethod
+    def from_env(cls):
+        port = os.environ.get('NIKE_METRICS_PORT')
+        return cls(os.environ.get('NIKE_METRICS_LOG'), os.environ.get('NIKE_METRICS_FILE'), int(port) if port else None)
+
+    def _emit(self, event, **fields):
+        if self._log is None:
+            return
+        line = json.dumps({'ts': time.time(), 'event': event, **fields}, default=str)
+        with self._lock:
+            self._log.write(line + '\n')
+
+    def observe(self, stage, seconds, **labels):
+        key = (stage, _label_key(labels))
+        with self._lock:
+            slot = self._stages.get(key)
+            if slot is None:
+                slot = self._stages[key] = [0] * len(BUCKETS) + [0, 0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    slot[i] += 1
+            slot[-2] += 1
+            slot[-1] += seconds
+        self._emit('stage', stage=stage, seconds=round(seconds, 6), **labels)
+
+    # Time a block (or, as a decorator, a function) as one observation of a stage
+    @contextmanager
+    def stage(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def count(self, name, n=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+        self._emit('count', name=name, n=n, **labels)
+
+    # Record the current value of something that goes up and down (e.g. a concurrency limit)
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    # Totals per stage and counter, e.g. for a summary at the end of a sweep
+    def snapshot(self):
+        with self._lock:
+            stages = {stage + _label_text(key): {'count': slot[-2], 'seconds': round(slot[-1], 6)}
+                      for (stage, key), slot in self._stages.items()}
+            counters = {name + _label_text(key): value for (name, key), value in self._counters.items()}
+            gauges = {name + _label_text(key): value for (name, key), value in self._gauges.items()}
+        return {'stages': stages, 'counters': counters, 'gauges': gauges}
+
+    def prometheus_text(self):
+        lines = [f'# TYPE {PREFIX}_stage_seconds histogram']
+        with self._lock:
+            stages = sorted((k, list(v)) for k, v in self._stages.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+        for (stage, key), slot in stages:
+            labels = (('stage', stage),) + key
+            for bound, value in zip(BUCKETS, slot):
+                lines.append(f'{PREFIX}_stage_seconds_bucket{_label_text(labels, [("le", bound)])} {value}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{_label_text(labels, [("le", "+Inf")])} {slot[-2]}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{_label_text(labels)} {slot[-1]:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{_label_text(labels)} {slot[-2]}')
+        declared = set()
+        for (name, key), value in counters:
+            if name not in declared:
+                lines.append(f'# TYPE {PREFIX}_{name}_total counter')
+                declared.add(name)
+            lines.append(f'{PREFIX}_{name}_total{_label_text(key)} {value}')
+        for (name, key), value in gauges:
+            if name not in declared:
+                lines.append(f'# TYPE {PREFIX}_{name} gauge')
+                declared.add(name)
+            lines.append(f'{PREFIX}_{name}{_label_text(key)} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    # Write the Prometheus text file atomically, so a node_exporter textfile collector never reads half a file
+    def write_prometheus(self, path=None):
+        path = path or self.prom_path
+        if not path:
+            return
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    # End-of-sweep export: refresh the text file and log the totals
+    def report(self):
+        self.write_prometheus()
+        self._emit('summary', **self.snapshot())
+
+    # Serve /metrics on localhost:port from a background thread
+    def serve(self, port, host='127.0.0.1'):
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200 if self.path.startswith('/metrics') else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+
+# Process-wide instance every module records into
+metrics = Metrics.from_env()
@@ -0,0 +1,295 @@
+import argparse
+import atexit
+import hashlib
+import itertools
+import os
+import sqlite3
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from Nike_Record_Sink import RecordSink
+
+ARCHIVE_DIR = 'page_archive'
+
+# Output columns of a re-parse, per page kind
+PRODUCT_COLUMNS = ["Product", "Name", "Price", "Category", "Subcategory", "Sub-subcategory", "Fetched"]
+SEARCH_COLUMNS = ["Page", "Title", "Price", "Link", "Fetched"]
+
+
+def _compressor(level):
+    try:
+        import zstandard
+    except ImportError:  # zstandard is optional; zlib is always there
+        return 'zlib', lambda body: zlib.compress(body, min(level, 9))
+    return 'zstd', zstandard.ZstdCompressor(level=level).compress
+
+
+def _decompress(codec, data):
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+# Search results, product page or anything else, from the URL
+def page_kind(url):
+    parts = urlsplit(url)
+    if parts.path.rstrip('/').endswith('/w') or 'q=' in parts.query:
+        return 'search'
+    if '/t/' in parts.path:
+        return 'product'
+    return 'page'
+
+
+# Every page the crawlers fetch, kept so the extractors can be re-run offline after a
+# markup change. Bodies are compressed one by one (zstd when installed, else zlib) and
+# appended to segment files; identical bodies are stored once, keyed by their hash.
+# index.sqlite records every fetch (url, kind, time, status, hash) and where each body
+# lives. Every writer appends to its own segment, so several processes can share an archive.
+class PageArchive:
+    def __init__(self, root=ARCHIVE_DIR, level=3, segment_bytes=256 * 2 ** 20, commit_every=1):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.commit_every = commit_every
+        self.codec, self._compress = _compressor(level)
+        self._pid = None
+        self.conn = None
+        self._segment = None
+        self._pending = 0
+
+    # The archive named by NIKE_PAGE_ARCHIVE, or None when archiving is off
+    @classmethod
+    def from_env(cls):
+        root = os.environ.get('NIKE_PAGE_ARCHIVE')
+        if not root:
+            return None
+        archive = cls(root)
+        atexit.register(archive.close)
+        return archive
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Connections and segment files are opened lazily, once per process
+    def _open(self):
+        if self._pid == os.getpid():
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self._pid = os.getpid()
+        self._segment = None
+        self._pending = 0
+        self.conn = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # commits are cheap, so writers never hold the lock for long
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                codec TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                status INTEGER,
+                content_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_by_url ON pages (url, fetched_at);""")
+        self.conn.commit()
+
+    def _append(self, data):
+        if self._segment is None or self._segment.tell() + len(data) > self.segment_bytes:
+            if self._segment is not None:
+                self._segment.close()
+            self._segment = open(os.path.join(self.root, f'seg-{uuid.uuid4().hex}.{self.codec}'), 'ab')
+        offset = self._segment.tell()
+        self._segment.write(data)
+        return os.path.basename(self._segment.name), offset
+
+    # Archive one fetched page; returns its content hash
+    def add(self, url, body, kind=None, status=200, fetched_at=None):
+        self._open()
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        content_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+        known = self.conn.execute("SELECT 1 FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        if known is None:
+            data = self._compress(body)
+            segment, offset = self._append(data)
+            self.conn.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                              (content_hash, segment, offset, len(data), len(body), self.codec))
+        self.conn.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?)",
+                          (url, kind or page_kind(url), fetched_at or time.time(), status, content_hash))
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+        return content_hash
+
+    # Bodies reach the segment file before the index rows that point at them
+    def commit(self):
+        if self.conn is None or self._pid != os.getpid():
+            return
+        if self._segment is not None:
+            self._segment.flush()
+        self.conn.commit()
+        self._pending = 0
+
+    # Body of the latest fetch of a URL, or None
+    def get(self, url):
+        self._open()
+        row = self.conn.execute("""
+            SELECT b.segment, b.offset, b.length, b.codec FROM pages p JOIN blobs b USING (content_hash)
+            WHERE p.url = ? ORDER BY p.fetched_at DESC LIMIT 1""", (url,)).fetchone()
+        return _read_blob(self.root, *row) if row else None
+
+    # Fetches of one kind, grouped by body: yields ((segment, offset, length, codec), [(url, fetched_at), ...])
+    # in segment order, so readers move through each file front to back. Only the latest
+    # fetch of each URL unless every_fetch is set.
+    def bodies(self, kind='product', every_fetch=False):
+        self.commit()
+        self._open()
+        latest = "" if every_fetch else \
+            "AND p.fetched_at = (SELECT MAX(fetched_at) FROM pages WHERE url = p.url)"
+        rows = self.conn.execute(f"""
+            SELECT b.segment, b.offset, b.length, b.codec, p.url, p.fetched_at
+            FROM pages p JOIN blobs b USING (content_hash)
+            WHERE p.kind = ? {latest}
+            ORDER BY b.segment, b.offset""", (kind,))
+        for location, fetches in itertools.groupby(rows, key=lambda row: row[:4]):
+            yield location, [(row[4], row[5]) for row in fetches]
+
+    # Page count, distinct bodies, and raw vs stored bytes
+    def stats(self):
+        self.commit()
+        self._open()
+        pages, = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        bodies, raw, stored = self.conn.execute("SELECT COUNT(*), SUM(size), SUM(length) FROM blobs").fetchone()
+        return {'pages': pages, 'bodies': bodies, 'raw_bytes': raw or 0, 'stored_bytes': stored or 0}
+
+    def close(self):
+        if self.conn is None or self._pid != os.getpid():
+            return
+        self.commit()
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        self.conn.close()
+        self.conn = None
+        self._pid = None
+
+
+_segment_files = {}
+
+
+def _read_blob(root, segment, offset, length, codec):
+    path = os.path.join(root, segment)
+    f = _segment_files.get(path)
+    if f is None:
+        f = _segment_files[path] = open(path, 'rb')
+    f.seek(offset)
+    return _decompress(codec, f.read(length)).decode('utf-8', errors='replace')
+
+
+def _fetched(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+# Runs in a pool process: decompress each body once and run today's extractors over it,
+# emitting one row per fetch that returned that body
+def _reparse_chunk(root, kind, mode, chunk):
+    from Nike_Parsers import get_parser
+    from Nike_Web_Crawler_Beaut import extract_product
+
+    parser = get_parser()
+    rows = []
+    for location, fetches in chunk:
+        html = _read_blob(root, *location)
+        if kind == 'product':
+            for url, fetched_at in fetches:
+                rows.append(dict(extract_product(url, html, parser, mode=mode), Fetched=_fetched(fetched_at)))
+        else:
+            cards = parser.parse_cards(html)
+            for url, fetched_at in fetches:
+                rows += [{"Page": url, "Title": title, "Price": price, "Link": link, "Fetched": _fetched(fetched_at)}
+                         for title, price, link in cards]
+    return rows
+
+
+# Re-run the current extractors over archived pages in a process pool and stream the rows to
+# output. A bounded number of chunks is in flight, so memory stays flat over millions of pages.
+# mode='dom' skips the embedded JSON state and exercises the markup selectors.
+def reparse(root=ARCHIVE_DIR, output='reparsed.csv', kind='product', processes=None, mode='state',
+            every_fetch=False, chunk_size=256):
+    processes = processes or os.cpu_count() or 1
+    archive = PageArchive(root)
+    bodies = archive.bodies(kind, every_fetch)
+    chunks = iter(lambda: list(itertools.islice(bodies, chunk_size)), [])
+    sink = RecordSink(output, PRODUCT_COLUMNS if kind == 'product' else SEARCH_COLUMNS, encoding='utf-8-sig')
+    in_flight = deque()
+    missing = 0
+
+    # Write out finished chunks, oldest first, until at most `limit` are outstanding
+    def drain(limit):
+        nonlocal missing
+        while len(in_flight) > limit:
+            for row in in_flight.popleft().result():
+                sink.write(row)
+                if kind == 'product' and (row["Name"] == 'N/A' or row["Price"] == 'N/A'):
+                    missing += 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for chunk in chunks:
+            in_flight.append(executor.submit(_reparse_chunk, root, kind, mode, chunk))
+            drain(processes * 2)
+        drain(0)
+    sink.close()
+    archive.close()
+    elapsed = time.perf_counter() - start
+    print(f"Re-parsed {sink.count} {kind} rows in {elapsed:.1f}s ({sink.count / elapsed if elapsed else 0:.0f}/s) "
+          f"into {sink.path}" + (f"; {missing} still missing a name or price" if kind == 'product' else ''))
+    return sink
+
+
+# Shared archive for every fetch path, set with NIKE_PAGE_ARCHIVE=<directory>
+page_archive = PageArchive.from_env()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the raw page archive and re-parse it offline")
+    parser.add_argument("--root", default=os.environ.get('NIKE_PAGE_ARCHIVE') or ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="pages, distinct bodies and compression")
+    rep = commands.add_parser("reparse", help="run the current extractors over archived pages")
+    rep.add_argument("--output", default="reparsed.csv", help=".csv or .parquet")
+    rep.add_argument("--kind", choices=["product", "search"], default="product")
+    rep.add_argument("--processes", type=int, help="default: one per core")
+    rep.add_argument("--mode", choices=["state", "dom"], default="state",
+                     help="'dom' ignores the embedded JSON state and parses the markup")
+    rep.add_argument("--every-fetch", action="store_true", help="every archived fetch, not just the latest per URL")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        with PageArchive(args.root) as archive:
+            stats = archive.stats()
+        ratio = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+        print(f"{stats['pages']} pages, {stats['bodies']} distinct bodies, "
+              f"{stats['raw_bytes'] / 2 ** 20:.1f} MB stored in {stats['stored_bytes'] / 2 ** 20:.1f} MB ({ratio:.1f}x)")
+    else:
+        reparse(args.root, args.output, kind=args.kind, processes=args.processes, mode=args.mode,
+                every_fetch=args.every_fetch)
+
+
+if __name__ == "__main__":
+    main()
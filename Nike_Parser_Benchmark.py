@@ -0,0 +1,101 @@
+import argparse
+import glob
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from Nike_Parsers import BACKENDS, get_parser
+
+
+# Synthetic pages used when no saved Nike pages are supplied
+def sample_pages():
+    card = ('<div class="product-card__body"><a class="product-card__link-overlay" href="/gb/t/dunk-low-retro-shoe-Kd1wZr/DD1391-{i:03d}"></a>'
+            '<div class="product-card__title">Nike Dunk Low Retro {i}</div><div class="product-card__subtitle">Men\'s Shoes</div>'
+            '<div class="product-price">£{i}.99</div></div>')
+    filler = '<div class="nav"><ul>' + '<li><a href="#">Link</a></li>' * 200 + '</ul></div>'
+    search = '<html><body>' + filler + '<div class="product-grid">' + ''.join(card.format(i=i) for i in range(60)) + '</div></body></html>'
+    pdp = ('<html><body>' + filler + '<nav aria-label="Breadcrumbs"><ol><li><a href="#">Men</a></li><li><a href="#">Shoes</a></li></ol></nav>'
+           '<div id="PDP"><h1 class="headline">Nike Dunk Low Retro</h1><div data-test="product-price">£99.99</div>'
+           + '<p>' + 'Description text. ' * 500 + '</p></div></body></html>')
+    return [search], [pdp]
+
+
+# Split saved pages into search result pages and product pages
+def load_pages(pages_dir):
+    search, product = [], []
+    for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        (search if 'product-card__body' in html else product).append(html)
+    if not search and not product:
+        return sample_pages()
+    return search, product
+
+
+# The current path: a full html.parser tree, then find_all/select over it
+def baseline_cards(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    cards = []
+    for item in soup.find_all('div', {'class': 'product-card__body'}):
+        title_elem = item.find('div', {'class': 'product-card__title'})
+        price_elem = item.find('div', {'class': 'product-price'})
+        link_elem = item.find('a', {'class': 'product-card__link-overlay'})
+        if title_elem and price_elem and link_elem:
+            cards.append((title_elem.text.strip(), price_elem.text.strip(), link_elem['href']))
+    return cards
+
+
+def baseline_pdp(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    name = soup.select_one('h1.headline')
+    price = soup.select_one('div[data-test="product-price"]')
+    return {
+        'name': name.text.strip() if name else None,
+        'price': price.text.strip() if price else None,
+        'categories': [a.text.strip() for a in soup.select('nav[aria-label="Breadcrumbs"] li a')],
+    }
+
+
+# Average milliseconds per page over the given number of rounds
+def time_per_page(func, pages, rounds):
+    if not pages:
+        return None
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            func(html)
+    return (time.perf_counter() - start) * 1000 / (rounds * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends over saved Nike pages")
+    parser.add_argument("--pages", default="saved_pages", help="directory of saved Nike search/product pages (*.html)")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    search, product = load_pages(args.pages)
+    print(f"{len(search)} search pages, {len(product)} product pages, {args.rounds} rounds")
+
+    candidates = [('html.parser (current)', baseline_cards, baseline_pdp)]
+    for backend in BACKENDS:
+        try:
+            p = get_parser(backend)
+        except ImportError:
+            print(f"{backend:<22} not installed, skipped")
+            continue
+        candidates.append((backend, p.parse_cards, p.parse_pdp))
+
+    baseline = None
+    for name, cards, pdp in candidates:
+        card_ms = time_per_page(cards, search, args.rounds)
+        pdp_ms = time_per_page(pdp, product, args.rounds)
+        total = (card_ms or 0) + (pdp_ms or 0)
+        baseline = baseline or total
+        card_text = f"{card_ms:.2f}ms" if card_ms is not None else "-"
+        pdp_text = f"{pdp_ms:.2f}ms" if pdp_ms is not None else "-"
+        print(f"{name:<22} cards {card_text:>9}/page   pdp {pdp_text:>9}/page   {baseline / total:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import os
+from functools import wraps
+
+from Nike_Metrics import metrics
+
+# Selectors for the search grid product cards and the product detail page (PDP)
+CARD_SELECTOR = 'div.product-card__body'
+CARD_TITLE_SELECTOR = 'div.product-card__title'
+CARD_PRICE_SELECTOR = 'div.product-price'
+CARD_LINK_SELECTOR = 'a.product-card__link-overlay'
+PDP_BREADCRUMB_SELECTOR = 'nav[aria-label="Breadcrumbs"] li a'
+
+# Ordered fallbacks for each PDP field: test hooks first, then class names, then structural
+# paths (the last ones are the absolute XPaths Nike_Web_Crawler.py used to wait on). Every
+# chain is tried against one parsed snapshot and the label of the match is counted once per
+# page as selector_fallback{field, selector}, so a markup change shows up as a shift between labels.
+PDP_FIELDS = {
+    'name': [
+        ('data-test', 'h1[data-test="product-title"]'),
+        ('data-testid', 'h1[data-testid="product_title"]'),
+        ('headline-5', 'h1.headline-5'),
+        ('headline', 'h1.headline'),
+        ('pdp-h1', '#PDP h1'),
+        ('absolute', 'body > div:nth-of-type(4) > div > div > div:nth-of-type(2) > div > div:nth-of-type(4) > '
+                     'div:nth-of-type(1) > div > div:nth-of-type(2) > div > h1'),
+    ],
+    'price': [
+        ('data-test', 'div[data-test="product-price"]'),
+        ('data-testid', '[data-testid="currentPrice-container"]'),
+        ('class', '#PDP div.product-price'),
+        ('absolute', '#PDP > div:nth-of-type(2) > div > div:nth-of-type(4) > div:nth-of-type(1) > div > '
+                     'div:nth-of-type(2) > div > div > div > div > div'),
+    ],
+}
+PDP_TEST_IDS = {'product-title', 'product_title', 'product-price', 'currentPrice-container'}
+
+# Fastest first; the first backend whose library is installed is the default
+BACKENDS = ['selectolax', 'lxml', 'bs4']
+BACKEND_MODULES = {'selectolax': 'selectolax.lexbor', 'lxml': 'lxml.cssselect', 'bs4': 'bs4'}
+
+
+def _text(node_text):
+    return node_text.strip() if node_text else ''
+
+
+# Walk each field's fallback chain over one snapshot. text_of(selector) returns the first
+# match's text or None. Returns ({field: text or None}, {field: matching label or None}).
+def _match_fields(text_of):
+    values, matched = {}, {}
+    for field, chain in PDP_FIELDS.items():
+        values[field] = matched[field] = None
+        for label, selector in chain:
+            text = text_of(selector)
+            if text:
+                values[field], matched[field] = text, label
+                break
+    return values, matched
+
+
+# Count which fallback found each field of a final parse_pdp result, or that none did
+def count_fields(source, result):
+    for field in ('name', 'price'):
+        label = result['matched'][field]
+        if label is None:
+            metrics.count('selector_misses', selector=f'pdp_{field}', source=source)
+        else:
+            metrics.count('selector_fallback', field=field, selector=label, source=source)
+
+
+# Time each parse per backend, and count the PDP fields it found. Callers that parse several
+# snapshots of one page (Nike_Lean_Browser.read_fields) pass count=False and count the last one.
+def _instrumented(page):
+    def decorate(method):
+        @wraps(method)
+        def parse(self, html, count=True):
+            with metrics.stage('parse', source=self.name, page=page):
+                result = method(self, html)
+            if page == 'pdp' and count:
+                count_fields(self.name, result)
+            return result
+        return parse
+    return decorate
+
+
+# selectolax (Lexbor engine): the fastest option, CSS matched natively in C
+class SelectolaxParser:
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parse = LexborHTMLParser
+
+    @_instrumented('cards')
+    def parse_cards(self, html):
+        cards = []
+        for card in self._parse(html).css(CARD_SELECTOR):
+            title = card.css_first(CARD_TITLE_SELECTOR)
+            price = card.css_first(CARD_PRICE_SELECTOR)
+            link = card.css_first(CARD_LINK_SELECTOR)
+            if title is None or price is None or link is None or not link.attributes.get('href'):
+                metrics.count('selector_misses', selector='card', source=self.name)
+                continue
+            cards.append((_text(title.text()), _text(price.text()), link.attributes['href']))
+        return cards
+
+    @_instrumented('pdp')
+    def parse_pdp(self, html):
+        tree = self._parse(html)
+
+        def text_of(selector):
+            node = tree.css_first(selector)
+            return _text(node.text()) if node is not None else None
+
+        fields, matched = _match_fields(text_of)
+        return dict(fields, categories=[_text(a.text()) for a in tree.css(PDP_BREADCRUMB_SELECTOR)], matched=matched)
+
+
+# lxml with the selectors compiled to XPath once, up front
+class LxmlParser:
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        from lxml.cssselect import CSSSelector
+        self._parse = lxml.html.fromstring
+        self._cards = CSSSelector(CARD_SELECTOR)
+        self._card_title = CSSSelector(CARD_TITLE_SELECTOR)
+        self._card_price = CSSSelector(CARD_PRICE_SELECTOR)
+        self._card_link = CSSSelector(CARD_LINK_SELECTOR)
+        self._pdp_fields = {selector: CSSSelector(selector) for chain in PDP_FIELDS.values() for _, selector in chain}
+        self._pdp_breadcrumbs = CSSSelector(PDP_BREADCRUMB_SELECTOR)
+
+    @staticmethod
+    def _first(selector, node):
+        found = selector(node)
+        return found[0] if found else None
+
+    @_instrumented('cards')
+    def parse_cards(self, html):
+        cards = []
+        for card in self._cards(self._parse(html)):
+            title = self._first(self._card_title, card)
+            price = self._first(self._card_price, card)
+            link = self._first(self._card_link, card)
+            if title is None or price is None or link is None or not link.get('href'):
+                metrics.count('selector_misses', selector='card', source=self.name)
+                continue
+            cards.append((_text(title.text_content()), _text(price.text_content()), link.get('href')))
+        return cards
+
+    @_instrumented('pdp')
+    def parse_pdp(self, html):
+        tree = self._parse(html)
+
+        def text_of(selector):
+            node = self._first(self._pdp_fields[selector], tree)
+            return _text(node.text_content()) if node is not None else None
+
+        fields, matched = _match_fields(text_of)
+        return dict(fields, categories=[_text(a.text_content()) for a in self._pdp_breadcrumbs(tree)], matched=matched)
+
+
+# Top-level PDP tags worth building: headings, the test-hooked name and price, and the
+# breadcrumbs. Structural fallbacks need the whole tree, so under bs4 only the test-hook
+# and class fallbacks can match.
+def _is_pdp_tag(name, attrs):
+    attrs = attrs or {}
+    return (name == 'h1'
+            or attrs.get('data-test') in PDP_TEST_IDS or attrs.get('data-testid') in PDP_TEST_IDS
+            or (name == 'nav' and attrs.get('aria-label') == 'Breadcrumbs'))
+
+
+def _pdp_strainer():
+    try:
+        from bs4.filter import ElementFilter
+    except ImportError:
+        # Before bs4 4.13 a SoupStrainer name function receives the tag's attributes too
+        from bs4 import SoupStrainer
+        return SoupStrainer(_is_pdp_tag)
+
+    class PdpFilter(ElementFilter):
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            return _is_pdp_tag(name, attrs)
+
+        def allow_string_creation(self, string):
+            return False
+
+    return PdpFilter()
+
+
+# BeautifulSoup, restricted with SoupStrainers so only the card / PDP subtrees are built
+class SoupParser:
+    name = 'bs4'
+
+    def __init__(self, features=None):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soup = BeautifulSoup
+        self._features = features or ('lxml' if _installed('lxml') else 'html.parser')
+        self._cards = SoupStrainer('div', class_='product-card__body')
+        self._pdp = _pdp_strainer()
+
+    @_instrumented('cards')
+    def parse_cards(self, html):
+        cards = []
+        for card in self._soup(html, self._features, parse_only=self._cards).select(CARD_SELECTOR):
+            title = card.select_one(CARD_TITLE_SELECTOR)
+            price = card.select_one(CARD_PRICE_SELECTOR)
+            link = card.select_one(CARD_LINK_SELECTOR)
+            if title is None or price is None or link is None or not link.get('href'):
+                metrics.count('selector_misses', selector='card', source=self.name)
+                continue
+            cards.append((_text(title.text), _text(price.text), link['href']))
+        return cards
+
+    @_instrumented('pdp')
+    def parse_pdp(self, html):
+        soup = self._soup(html, self._features, parse_only=self._pdp)
+
+        def text_of(selector):
+            node = soup.select_one(selector)
+            return _text(node.text) if node is not None else None
+
+        fields, matched = _match_fields(text_of)
+        return dict(fields, categories=[_text(a.text) for a in soup.select(PDP_BREADCRUMB_SELECTOR)], matched=matched)
+
+
+_PARSER_CLASSES = {
+    'selectolax': SelectolaxParser,
+    'lxml': LxmlParser,
+    'bs4': SoupParser,
+}
+_parsers = {}
+
+
+def _installed(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+# Return a shared parser for the requested backend (or NIKE_PARSER, or the fastest installed one)
+def get_parser(backend=None):
+    backend = backend or os.environ.get('NIKE_PARSER')
+    if backend is None:
+        backend = next(name for name in BACKENDS if name == 'bs4' or _installed(BACKEND_MODULES[name]))
+    if backend not in _parsers:
+        if backend not in _PARSER_CLASSES:
+            raise ValueError(f"Unknown parser backend {backend!r}, choose from {', '.join(BACKENDS)}")
+        _parsers[backend] = _PARSER_CLASSES[backend]()
+    return _parsers[backend]
@@ -0,0 +1,161 @@
+import json
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from Nike_Frontier import product_key
+from Nike_Metrics import metrics
+from Nike_Price_Normalizer import current_price
+
+EVENTS = ('price_down', 'price_up', 'new', 'delisted', 'relisted')
+
+
+# Appends one JSON event per line, flushed as it is written so a tail -f sees it at once
+class JsonlSink:
+    def __init__(self, path='price_alerts.jsonl'):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self._file.write(json.dumps(event) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# Posts each event as JSON to a webhook from a background thread, so a slow or dead
+# endpoint never holds up the crawl. Failed posts are counted and dropped.
+class WebhookSink:
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._post_all, daemon=True)
+        self._thread.start()
+
+    def __call__(self, event):
+        self._queue.put(event)
+
+    def _post_all(self):
+        import requests
+
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            try:
+                requests.post(self.url, json=event, timeout=self.timeout).raise_for_status()
+            except requests.RequestException as e:
+                print(f"Webhook post failed for {event['style_code']}: {e}")
+                metrics.count('webhook_errors')
+
+    # Send whatever is still queued, then stop
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+# Streams price changes as the crawl runs. The latest price of every product sits in a
+# dict keyed by style code, so each scraped record is compared in O(1) the moment it
+# arrives, and an event goes to every sink straight away:
+#   price_down / price_up  the price moved by at least min_change
+#   new                    first time this style code is seen
+#   delisted               the product came back empty `grace` sweeps in a row (see missed())
+#   relisted               a delisted product is back
+# The snapshot is saved to snapshot_path, so the next run compares against this one.
+class PriceChangeDetector:
+    def __init__(self, sinks=(), snapshot_path='price_snapshot.json', min_change=0.005, grace=2):
+        self.sinks = list(sinks)
+        self.snapshot_path = snapshot_path
+        self.min_change = min_change
+        self.grace = grace
+        self.snapshot = {}
+        if snapshot_path and os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding='utf-8') as f:
+                self.snapshot = json.load(f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _emit(self, kind, key, entry, old_price=None):
+        new_price = None if kind == 'delisted' else entry.get('price')
+        event = {
+            'event': kind,
+            'style_code': key,
+            'name': entry.get('name'),
+            'url': entry.get('url'),
+            'old_price': old_price,
+            'new_price': new_price,
+            'change_pct': round((new_price / old_price - 1) * 100, 1) if old_price and new_price is not None else None,
+            'currency': entry.get('currency'),
+            'ts': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        metrics.count('price_events', kind=kind)
+        for sink in self.sinks:
+            sink(event)
+        return event
+
+    # Compare one scraped record against the snapshot; returns the event emitted, if any.
+    # price may be a number or raw scraped text.
+    def observe(self, url, price, name=None, currency=None):
+        price = current_price(price)
+        if price is None:
+            return None
+        key = product_key(url)
+        entry = self.snapshot.get(key)
+        if entry is None:
+            entry = self.snapshot[key] = {'url': url, 'name': name, 'price': price, 'currency': currency,
+                                          'misses': 0, 'delisted': False}
+            return self._emit('new', key, entry)
+
+        old_price = entry['price']
+        entry.update(url=url, price=price, misses=0, name=name or entry['name'], currency=currency or entry['currency'])
+        if entry['delisted']:
+            entry['delisted'] = False
+            return self._emit('relisted', key, entry, old_price)
+        if old_price is not None and abs(price - old_price) >= self.min_change:
+            return self._emit('price_down' if price < old_price else 'price_up', key, entry, old_price)
+        return None
+
+    # A product the sweep asked for came back with no record (gone, or no price on the page).
+    # After `grace` such sweeps in a row it is reported as delisted, once.
+    def missed(self, url):
+        key = product_key(url)
+        entry = self.snapshot.get(key)
+        if entry is None or entry['delisted']:
+            return None
+        entry['misses'] += 1
+        if entry['misses'] < self.grace:
+            return None
+        entry['delisted'] = True
+        return self._emit('delisted', key, entry, entry['price'])
+
+    def save(self):
+        if not self.snapshot_path:
+            return
+        tmp = self.snapshot_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot, f)
+        os.replace(tmp, self.snapshot_path)
+
+    # Save the snapshot and close every sink that can be closed
+    def close(self):
+        self.save()
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+
+# Detector writing to a JSONL file and, optionally, a webhook
+def alert_stream(path='price_alerts.jsonl', webhook=None, snapshot_path='price_snapshot.json'):
+    sinks = [JsonlSink(path)] if path else []
+    if webhook:
+        sinks.append(WebhookSink(webhook))
+    return PriceChangeDetector(sinks, snapshot_path=snapshot_path)
@@ -0,0 +1,64 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from Nike_Price_Normalizer import normalize_prices
+
+# The kinds of raw price strings the crawlers collect
+SAMPLES = [
+    '£{a}.99',
+    '£1,{a}.00',
+    '£{b}.97£{a}.99',
+    '<div class="product-price is--current-price">£{b}.97</div><div class="product-price is--striked-out">£{a}.99</div>',
+    '£{b}.00 - £{a}.00',
+    '€{a},00',
+    '1.{a},99 €',
+    '1 {a},99 €',
+    '1\u00a0{a},99\u202f€',
+    '16.{a} ¥',
+    'N/A',
+    '',
+]
+
+
+def make_prices(rows, seed=0):
+    rng = random.Random(seed)
+    return pd.Series([rng.choice(SAMPLES).format(a=rng.randint(60, 199), b=rng.randint(10, 59)) for _ in range(rows)])
+
+
+# The current approach from parse(): strip symbols item by item and fall back to 0.0
+def baseline(prices):
+    values = []
+    for price in prices:
+        price = price.replace('£', '').replace(',', '')
+        try:
+            values.append(float(price) if price else 0.0)
+        except ValueError:
+            values.append(0.0)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch price normalization")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    prices = make_prices(args.rows)
+
+    start = time.perf_counter()
+    baseline(prices)
+    base = time.perf_counter() - start
+    print(f"per-item replace/float  {args.rows} rows in {base:.2f}s ({args.rows / base:,.0f} rows/sec, sale/range/currency lost)")
+
+    start = time.perf_counter()
+    normalized = normalize_prices(prices)
+    elapsed = time.perf_counter() - start
+    print(f"normalize_prices        {args.rows} rows in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/sec)")
+    print(f"parsed {normalized['current_price'].notna().mean():.1%} of rows, "
+          f"{(normalized['discount_pct'] > 0).mean():.1%} on sale")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import functools
+import os
+import uuid
+from datetime import datetime, timezone
+
+from Nike_Frontier import style_code
+from Nike_Metrics import metrics
+
+
+# Row schema, date partitioning and dataset schema. Built on first use, so that crawls
+# which only append snapshots do not load pyarrow until the first flush.
+@functools.cache
+def schemas():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = pa.schema([
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('style_code', pa.string()),
+        ('name', pa.string()),
+        ('price', pa.float64()),
+        ('currency', pa.string()),
+        ('category', pa.string()),
+        ('url', pa.string()),
+    ])
+    partitioning = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+    return schema, partitioning, schema.append(pa.field('date', pa.string()))
+
+
+# Append-only price history, stored as Parquet partitioned by UTC date
+# (price_history/date=2026-10-18/part-....parquet). Snapshots are buffered and each
+# flush writes new files, so existing partitions are never rewritten.
+class PriceHistory:
+    def __init__(self, root='price_history', batch_size=5000):
+        self.root = root
+        self.batch_size = batch_size
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    # Record one price snapshot; price may be raw scraped text, it is normalized at flush
+    def append(self, url, price, name=None, currency=None, category=None, timestamp=None):
+        self._rows.append({
+            'timestamp': timestamp or datetime.now(timezone.utc),
+            'style_code': style_code(url),
+            'name': name,
+            'price': price,
+            'currency': currency,
+            'category': category,
+            'url': url,
+        })
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    # Normalize the buffered prices in one batch, then write one new file per date partition
+    def flush(self):
+        if not self._rows:
+            return
+        with metrics.stage('sink_write', sink='history'):
+            self._write_partitions()
+        self._rows = []
+
+    def _write_partitions(self):
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from Nike_Price_Normalizer import normalize_prices
+
+        schema = schemas()[0]
+        prices = normalize_prices(pd.Series([row['price'] for row in self._rows], dtype=object))
+        by_date = {}
+        for row, price, currency in zip(self._rows, prices['current_price'], prices['currency']):
+            if pd.isna(price):
+                continue
+            row['price'] = price
+            row['currency'] = row['currency'] or currency
+            by_date.setdefault(row['timestamp'].astimezone(timezone.utc).date().isoformat(), []).append(row)
+        for date, rows in by_date.items():
+            directory = os.path.join(self.root, f'date={date}')
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pylist(rows, schema=schema)
+            pq.write_table(table, os.path.join(directory, f'part-{uuid.uuid4().hex}.parquet'))
+
+    def _dataset(self):
+        import pyarrow.dataset as ds
+
+        _, partitioning, dataset_schema = schemas()
+        return ds.dataset(self.root, schema=dataset_schema, format='parquet', partitioning=partitioning)
+
+    # Scan only the date partitions in [start, end] and only the requested columns
+    def query(self, columns=None, start=None, end=None, style_codes=None):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        self.flush()
+        if not os.path.isdir(self.root):
+            dataset_schema = schemas()[2]
+            return pa.table({name: pa.array([], dataset_schema.field(name).type) for name in (columns or dataset_schema.names)})
+        condition = None
+        if start is not None:
+            condition = ds.field('date') >= str(start)
+        if end is not None:
+            clause = ds.field('date') <= str(end)
+            condition = clause if condition is None else condition & clause
+        if style_codes is not None:
+            clause = ds.field('style_code').isin(list(style_codes))
+            condition = clause if condition is None else condition & clause
+        return self._dataset().to_table(columns=columns, filter=condition)
+
+    # Price series for one product as a DataFrame sorted by timestamp
+    def price_series(self, code, start=None, end=None):
+        table = self.query(columns=['timestamp', 'price', 'currency'], start=start, end=end, style_codes=[code])
+        return table.to_pandas().sort_values('timestamp').reset_index(drop=True)
@@ -0,0 +1,126 @@
+import re
+
+from Nike_Metrics import metrics
+
+CURRENCY_CODES = {'£': 'GBP', '€': 'EUR', '$': 'USD', '¥': 'JPY', 'GBP': 'GBP', 'EUR': 'EUR', 'USD': 'USD', 'JPY': 'JPY'}
+
+# All patterns are RE2 so they run inside Arrow's compute kernels, not row by row in Python
+_TAGS = r'<[^>]+>'
+_PERCENT = r'\d+(?:\.\d+)?\s*%'
+# European thousands separators ('1.299,99 €', '1 299,99 €' with a space, NBSP or narrow NBSP,
+# '16.500 ¥'): a group of 1-3 digits that is not itself a decimal part, then one or two
+# separator + three-digit groups followed by a ',dd' decimal or the end of the number. They
+# are joined before anything else, so one price is never read as a sale pair.
+_GROUP_SEPARATOR = '[. \u00a0\u202f]'
+_GROUPS = r'(^|[^\d.,])(\d{1,3})' + _GROUP_SEPARATOR + r'(\d{3})(?:' + _GROUP_SEPARATOR + r'(\d{3}))?'
+_GROUPED_DECIMAL_COMMA = _GROUPS + r',(\d{2})\b'
+_GROUPED_WHOLE = _GROUPS + r'([^\d.,]|$)'
+_DECIMAL_COMMA = r'(\d),(\d{2})\b'
+_THOUSANDS = r'(\d),(\d)'
+_TWO_NUMBERS = r'(?P<first>\d+(?:\.\d+)?)(?:\D*?(?P<second>\d+(?:\.\d+)?))?'
+_RANGE = r'\d\s*[-–]\s*\D{0,4}\d'
+_CURRENCY = r'(?P<currency>£|€|\$|¥|GBP|EUR|USD|JPY)'
+
+COLUMNS = ['current_price', 'original_price', 'discount_pct', 'currency', 'max_price']
+
+
+# Price the customer pays now from one raw value (a number or scraped text), read the same
+# way as normalize_prices but with the re module, so a single record never loads pandas or Arrow
+def current_price(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) if value == value else None
+    if not isinstance(value, str):
+        return None
+    text = re.sub(_PERCENT, ' ', re.sub(_TAGS, ' ', value))
+    text = re.sub(_GROUPED_DECIMAL_COMMA, r'\1\2\3\4.\5', text)
+    text = re.sub(_GROUPED_WHOLE, r'\1\2\3\4\5', text)
+    text = re.sub(_THOUSANDS, r'\1\2', re.sub(_DECIMAL_COMMA, r'\1.\2', text))
+    numbers = re.search(_TWO_NUMBERS, text)
+    if numbers is None:
+        return None
+    return min(float(number) for number in numbers.groups() if number is not None)
+
+
+# Raw column as an Arrow string array, without a Python round trip when it is already Arrow-backed
+def _to_arrow_strings(raw):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if hasattr(raw.array, '__arrow_array__'):
+        return pc.cast(pa.array(raw.array), pa.string())
+    try:
+        return pa.array(raw, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if pd.isna(value) else str(value) for value in raw], pa.string())
+
+
+# Map the few distinct currency markers once instead of per row
+def _currency_codes(text):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    markers = pc.dictionary_encode(pc.struct_field(pc.extract_regex(text, _CURRENCY), 'currency'))
+    codes = pa.array([CURRENCY_CODES.get(marker) for marker in markers.dictionary.to_pylist()], pa.string())
+    return pc.take(codes, markers.indices).to_numpy(zero_copy_only=False)
+
+
+def _to_float(strings):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    strings = pc.if_else(pc.equal(strings, ''), pa.scalar(None, pa.string()), strings)
+    return pc.cast(strings, pa.float64()).to_numpy(zero_copy_only=False)
+
+
+# Turn a whole column of raw scraped prices into typed columns in one vectorized pass.
+# Handles plain prices ('£99.99', '£1,299.99', '€120,00', '1.299,99 €', '1 299,99 €',
+# '16.500 ¥'), numbers, 'N/A'/blank, sale
+# markup with a strike-through price in either order (text or innerHTML, '27% off'
+# badges ignored), and ranges ('£45 - £60').
+#   current_price  price the customer pays now (the low end of a range)
+#   original_price strike-through price when on sale, else the current price
+#   discount_pct   percentage off the original price (0 when not on sale)
+#   currency       ISO code from the symbol, or default_currency when there is none
+#   max_price      high end of a range, else the current price
+@metrics.stage('normalize')
+def normalize_prices(raw, default_currency=None):
+    import numpy as np
+    import pandas as pd
+    import pyarrow.compute as pc
+
+    raw = pd.Series(raw)
+    result = pd.DataFrame(index=raw.index)
+
+    if pd.api.types.is_numeric_dtype(raw.dtype):
+        current = raw.astype('float64')
+        result['current_price'] = current
+        result['original_price'] = current
+        result['discount_pct'] = np.where(current.notna(), 0.0, np.nan)
+        result['currency'] = default_currency
+        result['max_price'] = current
+        return result
+
+    text = pc.fill_null(_to_arrow_strings(raw), '')
+    text = pc.replace_substring_regex(text, _TAGS, ' ')
+    text = pc.replace_substring_regex(text, _PERCENT, ' ')
+    text = pc.replace_substring_regex(text, _GROUPED_DECIMAL_COMMA, r'\1\2\3\4.\5')
+    text = pc.replace_substring_regex(text, _GROUPED_WHOLE, r'\1\2\3\4\5')
+    text = pc.replace_substring_regex(text, _DECIMAL_COMMA, r'\1.\2')
+    text = pc.replace_substring_regex(text, _THOUSANDS, r'\1\2')
+
+    numbers = pc.extract_regex(text, _TWO_NUMBERS)
+    first = _to_float(pc.struct_field(numbers, 'first'))
+    second = _to_float(pc.struct_field(numbers, 'second'))
+    is_range = pc.fill_null(pc.match_substring_regex(text, _RANGE), False).to_numpy(zero_copy_only=False) & ~np.isnan(second)
+
+    low = np.fmin(first, second)
+    high = np.fmax(first, second)
+
+    result['current_price'] = low
+    result['original_price'] = np.where(is_range, low, high)
+    result['discount_pct'] = np.round((1 - low / result['original_price'].to_numpy()) * 100, 1)
+    currency = pd.Series(_currency_codes(text), index=raw.index, dtype=object)
+    result['currency'] = currency.fillna(default_currency) if default_currency else currency
+    result['max_price'] = np.where(is_range, high, low)
+    return result
@@ -0,0 +1,231 @@
+import argparse
+import heapq
+import json
+import os
+import time
+
+from Nike_Frontier import Frontier, product_key
+from Nike_Metrics import metrics
+from Nike_Price_Alerts import alert_stream
+from Nike_Price_History import PriceHistory
+from Nike_Price_Normalizer import current_price
+from Nike_State_Extractor import scrape_state
+
+# The products Nike_Web_Crawler.py watches, used when no watchlist file is given
+WATCHLIST = [
+    'https://www.nike.com/gb/t/dunk-low-retro-shoe-Kd1wZr/DD1391-103',
+    'https://www.nike.com/gb/t/dunk-low-retro-shoe-QgD9Gv/DD1391-100',
+    'https://www.nike.com/gb/t/dunk-low-retro-shoes-p6gmkm/DV0833-400',
+    'https://www.nike.com/gb/t/air-max-95-shoes-4h4CP9/FQ1235-002',
+    'https://www.nike.com/gb/t/air-jordan-1-retro-high-og-shoes-lZQrDX/DZ5485-051',
+]
+
+
+# One URL per line; blank lines and # comments are ignored
+def read_watchlist(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+# Long-running price watcher. Every product sits in a heap ordered by when it is next due.
+# Each product's change rate is estimated from what has been seen so far (changes per hour,
+# smoothed towards prior_rate until there is enough history), boosted while it is on sale,
+# and the hourly request budget is shared out in proportion to those rates: volatile
+# products come round often, stable ones rarely, always within [min_interval, max_interval].
+# A token bucket keeps the actual request rate under budget_per_hour whatever is due.
+# With a PriceChangeDetector, every observation is also checked for price changes. Pages
+# without embedded state, or that failed over HTTP, are rendered in the browser pool, and
+# only a rendered page without the product counts towards it being delisted; without a
+# pool, or when the render fails too, the product is simply checked again later.
+class PriceWatch:
+    def __init__(self, urls, budget_per_hour=120, min_interval=300, max_interval=86400, sale_boost=2.0,
+                 prior_rate=1 / 24, prior_hours=24, state_path='watch_state.json', history=None, alerts=None,
+                 pool=None):
+        self.budget_per_hour = budget_per_hour
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.sale_boost = sale_boost
+        self.prior_rate = prior_rate
+        self.prior_hours = prior_hours
+        self.state_path = state_path
+        self.history = history
+        self.alerts = alerts
+        self.pool = pool
+        self.items = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as f:
+                self.items = json.load(f)
+        for url in Frontier().filter(urls):
+            self.items.setdefault(product_key(url), {
+                'url': url, 'price': None, 'on_sale': False, 'changes': 0,
+                'first_seen': None, 'last_visit': None, 'due': 0.0,
+            })
+        self._heap = [(item['due'], key) for key, item in self.items.items()]
+        heapq.heapify(self._heap)
+        self.capacity = max(1.0, budget_per_hour / 60)  # at most a minute's worth of requests in one burst
+        self._tokens = self.capacity
+        self._refilled = None
+
+    # Estimated price changes per hour
+    def rate(self, item, now):
+        hours = (now - item['first_seen']) / 3600 if item['first_seen'] else 0.0
+        rate = (item['changes'] + self.prior_rate * self.prior_hours) / (hours + self.prior_hours)
+        return rate * self.sale_boost if item['on_sale'] else rate
+
+    # Seconds until the product should be checked again: its share of the hourly budget
+    def interval(self, item, now, total_rate):
+        visits_per_hour = self.budget_per_hour * self.rate(item, now) / total_rate
+        return min(self.max_interval, max(self.min_interval, 3600 / visits_per_hour))
+
+    def _refill(self, now):
+        if self._refilled is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._refilled) * self.budget_per_hour / 3600)
+        self._refilled = now
+
+    # Pop up to `limit` products that are due and the budget allows for right now
+    def take_due(self, now, limit):
+        self._refill(now)
+        keys = []
+        while self._heap and self._heap[0][0] <= now and len(keys) < min(limit, int(self._tokens)):
+            keys.append(heapq.heappop(self._heap)[1])
+        self._tokens -= len(keys)
+        return keys
+
+    # Seconds to sleep before anything can be taken again
+    def wait_time(self, now):
+        next_due = self._heap[0][0] - now if self._heap else self.max_interval
+        next_token = (1 - self._tokens) * 3600 / self.budget_per_hour if self._tokens < 1 else 0.0
+        return max(next_due, next_token, 0.0)
+
+    # Fold one observation into the product's history and put it back on the heap. state is
+    # None when nothing was read; absent says the page loaded and the product was not on it.
+    # Returns True when the price changed since the last visit.
+    def record(self, key, state, now, total_rate, absent=False):
+        item = self.items[key]
+        changed = False
+        if state is not None:
+            price = state['sale_price'] if state['sale_price'] is not None else state['price']
+            changed = item['price'] is not None and price != item['price']
+            if changed:
+                item['changes'] += 1
+                print(f"Price change: {state['name']} {item['price']} -> {price} ({item['url']})")
+            item['price'] = price
+            item['on_sale'] = state['sale_price'] is not None
+            item['first_seen'] = item['first_seen'] or now
+            if self.history is not None:
+                self.history.append(item['url'], price, name=state['name'], currency=state['currency'],
+                                    category=state['categories'][0] if state['categories'] else None)
+            if self.alerts is not None:
+                self.alerts.observe(item['url'], price, name=state['name'], currency=state['currency'])
+        elif absent and self.alerts is not None:
+            self.alerts.missed(item['url'])
+        item['last_visit'] = now
+        item['due'] = now + (self.interval(item, now, total_rate) if item['first_seen'] else self.min_interval)
+        heapq.heappush(self._heap, (item['due'], key))
+        return changed
+
+    def save(self):
+        if not self.state_path:
+            return
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.items, f)
+        os.replace(tmp, self.state_path)
+
+    # Render the pages HTTP could not read. Returns the records found, keyed by URL, in the
+    # shape extract_state gives, and the URLs whose rendered page had no name or price.
+    def render(self, urls):
+        from Nike_Batch import scrape_in_browser
+
+        found, absent = {}, set()
+        for data in self.pool.map(scrape_in_browser, urls):
+            if data is None:
+                continue
+            price = current_price(data["Price"])
+            if data["Name"] == 'N/A' or price is None:
+                absent.add(data["Product"])
+            else:
+                categories = [data[column] for column in ("Category", "Subcategory", "Sub-subcategory") if data[column]]
+                found[data["Product"]] = {'name': data["Name"], 'price': price, 'sale_price': None, 'currency': None,
+                                          'categories': categories}
+        return found, absent
+
+    # Check one batch of due products over HTTP, rendering the rest; returns (checked, changed)
+    def step(self, now, batch_size=16):
+        keys = self.take_due(now, batch_size)
+        if not keys:
+            return 0, 0
+        urls = {self.items[key]['url']: key for key in keys}
+        found, missing = scrape_state(list(urls))
+        absent = set()
+        if missing and self.pool is not None:
+            rendered, absent = self.render(missing)
+            found.update(rendered)
+        total_rate = sum(self.rate(item, now) for item in self.items.values())
+        changed = 0
+        for url, key in urls.items():
+            changed += self.record(key, found.get(url), now, total_rate, absent=url in absent)
+        metrics.count('watch_checks', len(keys))
+        metrics.count('watch_changes', changed)
+        if missing:
+            metrics.count('watch_misses', len(missing))
+        if self.history is not None:
+            self.history.flush()
+        if self.alerts is not None:
+            self.alerts.save()
+        self.save()
+        return len(keys), changed
+
+    # Run until stopped (or for `hours`), sleeping whenever nothing is due or the budget is spent
+    def run(self, batch_size=16, hours=None):
+        stop = time.time() + hours * 3600 if hours else None
+        checked = changed = 0
+        while stop is None or time.time() < stop:
+            now = time.time()
+            n, c = self.step(now, batch_size)
+            checked += n
+            changed += c
+            if n:
+                print(f"Checked {n} products, {c} changed ({changed} changes in {checked} checks so far)")
+                metrics.report()
+            else:
+                time.sleep(min(self.wait_time(now), stop - now if stop else float('inf'), 60))
+        return checked, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch Nike prices continuously, checking volatile products most often")
+    parser.add_argument("--watchlist", help="file with one product URL per line (default: the Nike_Web_Crawler.py list)")
+    parser.add_argument("--budget", type=int, default=120, help="maximum product requests per hour")
+    parser.add_argument("--min-interval", type=int, default=300, help="seconds; no product is checked more often")
+    parser.add_argument("--max-interval", type=int, default=86400, help="seconds; every product is checked at least this often")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--hours", type=float, help="stop after this many hours (default: run until interrupted)")
+    parser.add_argument("--state", default="watch_state.json")
+    parser.add_argument("--history", default="price_history")
+    parser.add_argument("--alerts", default="price_alerts.jsonl", help="JSONL file price changes are streamed to")
+    parser.add_argument("--webhook", help="also post each price change to this URL")
+    parser.add_argument("--pool-size", type=int, default=2, help="browsers for pages that need rendering")
+    parser.add_argument("--no-browser", action="store_true",
+                        help="never render pages (products that cannot be read over HTTP are never reported delisted)")
+    args = parser.parse_args()
+
+    pool = None
+    if not args.no_browser:
+        from Nike_Browser_Pool import BrowserPool
+        from Nike_Lean_Browser import block_resources, lean_options
+
+        pool = BrowserPool(size=args.pool_size, options_factory=lean_options, setup=block_resources)
+    urls = read_watchlist(args.watchlist) if args.watchlist else WATCHLIST
+    with PriceHistory(args.history) as history, alert_stream(args.alerts, args.webhook) as alerts:
+        watch = PriceWatch(urls, budget_per_hour=args.budget, min_interval=args.min_interval,
+                           max_interval=args.max_interval, state_path=args.state, history=history, alerts=alerts,
+                           pool=pool)
+        try:
+            watch.run(batch_size=args.batch_size, hours=args.hours)
+        except KeyboardInterrupt:
+            watch.save()
+
+
+if __name__ == "__main__":
+    main()
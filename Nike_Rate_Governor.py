@@ -0,0 +1,217 @@
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from Nike_Metrics import metrics
+
+# Responses worth retrying; the first two also mean "slow down"
+RETRY_STATUSES = {429, 503, 500, 502, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+# Seconds from a Retry-After header (delta-seconds or an HTTP date), or None
+def retry_after_seconds(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+# Adaptive request governor shared by a fetch path. It caps how many requests are in
+# flight with an AIMD window, the way TCP does congestion control:
+#   - slow start: the window grows by one per healthy response until the first sign of trouble
+#   - then additive increase: roughly one more slot per window's worth of healthy responses
+#   - multiplicative decrease on 429/503, other 5xx, timeouts and latency spikes
+#     (at most once per round trip, so one burst of errors counts as one signal)
+#   - a Retry-After on a throttled response pauses every request until it has passed
+# Retries get full-jitter exponential backoff and a per-URL budget of `retries` attempts.
+class RateGovernor:
+    def __init__(self, initial=2, minimum=1, maximum=16, backoff=0.5, spike=3.0, cooldown=1.0, retries=3,
+                 base_delay=0.5, max_delay=60.0, name='http'):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.spike = spike
+        self.cooldown = cooldown
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.threshold = float(maximum)  # slow start until the first decrease
+        self.latency = None               # moving average of healthy response times
+        self.in_flight = 0
+        self._samples = 0
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    # Seconds until a slot may be taken: 0 once taken, None when waiting on a release
+    def _take(self):
+        now = time.monotonic()
+        if now < self._pause_until:
+            return self._pause_until - now
+        if self.in_flight < max(self.minimum, int(self.limit)):
+            self.in_flight += 1
+            return 0
+        return None
+
+    def acquire(self):
+        with self._released:
+            while True:
+                wait = self._take()
+                if wait == 0:
+                    return
+                self._released.wait(wait)
+
+    async def acquire_async(self):
+        while True:
+            with self._lock:
+                wait = self._take()
+            if wait == 0:
+                return
+            await asyncio.sleep(wait if wait is not None else 0.01)
+
+    def release(self):
+        with self._released:
+            self.in_flight -= 1
+            self._released.notify_all()
+
+    def _increase(self):
+        if self.limit < self.threshold:
+            self.limit += 1
+        else:
+            self.limit += 1 / self.limit
+        self.limit = min(self.limit, float(self.maximum))
+        self._released.notify_all()
+
+    def _decrease(self, reason):
+        # One decrease per round trip (or per cooldown before the latency is known), like TCP
+        now = time.monotonic()
+        cooldown = self.cooldown if self.latency is None else min(self.cooldown, 2 * self.latency)
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self.threshold = max(float(self.minimum), self.limit * self.backoff)
+        self.limit = self.threshold
+        metrics.count('backoffs', source=self.name, reason=reason)
+
+    # Feed in one response: its latency, status code and Retry-After header
+    def observe(self, latency, status=200, retry_after=None):
+        with self._released:
+            if status in THROTTLE_STATUSES:
+                metrics.count('throttled', source=self.name, status=status)
+                self._decrease('throttled')
+                pause = retry_after_seconds(retry_after)
+                if pause:
+                    self._pause_until = max(self._pause_until, time.monotonic() + min(pause, self.max_delay))
+            elif status in RETRY_STATUSES:
+                self._decrease('server_error')
+            else:
+                spiked = self.latency is not None and self._samples >= 5 and latency > self.spike * self.latency
+                # The average follows slow drifts, so a lasting rise stops counting as a spike
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self._samples += 1
+                if spiked:
+                    self._decrease('latency')
+                else:
+                    self._increase()
+            metrics.gauge('concurrency_limit', self.limit, source=self.name)
+
+    # A request that timed out or could not connect
+    def timed_out(self):
+        with self._released:
+            self._decrease('timeout')
+            metrics.gauge('concurrency_limit', self.limit, source=self.name)
+
+    # Seconds to wait before retrying url, or None when it should not be retried:
+    # a status that retrying will not fix, or the URL's retry budget is spent
+    def retry_delay(self, url, status=None, retry_after=None):
+        if status is not None and status not in RETRY_STATUSES:
+            return None
+        with self._lock:
+            attempt = self._attempts.get(url, 0)
+            if attempt >= self.retries:
+                self._attempts.pop(url, None)
+                return None
+            self._attempts[url] = attempt + 1
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        pause = retry_after_seconds(retry_after)
+        return max(delay, min(pause, self.max_delay)) if pause else delay
+
+    # Drop a URL's retry count once it has gone through
+    def forget(self, url):
+        with self._lock:
+            self._attempts.pop(url, None)
+
+
+# Governor for the blocking requests paths in this process
+default_governor = RateGovernor(name='http')
+
+
+# Blocking GET through a governor. Throttled, 5xx and timed-out requests are retried with
+# jittered backoff until the URL's budget is spent; the last response is returned either way
+# (so raise_for_status() still reports it) and connection errors are re-raised.
+def governed_get(url, governor=None, session=None, **kwargs):
+    import requests
+
+    governor = governor or default_governor
+    kwargs.setdefault('timeout', 30)
+    while True:
+        governor.acquire()
+        start = time.perf_counter()
+        try:
+            response = (session or requests).get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            governor.timed_out()
+            delay = governor.retry_delay(url)
+            if delay is None:
+                raise
+        else:
+            retry_after = response.headers.get('Retry-After')
+            governor.observe(time.perf_counter() - start, response.status_code, retry_after)
+            delay = None
+            if response.status_code in RETRY_STATUSES:
+                delay = governor.retry_delay(url, response.status_code, retry_after)
+            if delay is None:
+                governor.forget(url)
+                return response
+        finally:
+            governor.release()
+        metrics.count('retries', source=governor.name)
+        time.sleep(delay)
+
+
+# Run fn() (e.g. a browser page load) through a governor, retrying the exceptions in
+# retry_on with jittered backoff until the URL's budget is spent, then re-raising
+def governed_call(url, fn, retry_on, governor=None):
+    governor = governor or default_governor
+    while True:
+        governor.acquire()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except retry_on:
+            governor.timed_out()
+            delay = governor.retry_delay(url)
+            if delay is None:
+                raise
+        else:
+            governor.observe(time.perf_counter() - start)
+            governor.forget(url)
+            return result
+        finally:
+            governor.release()
+        metrics.count('retries', source=governor.name)
+        time.sleep(delay)
@@ -0,0 +1,112 @@
+import csv
+import os
+
+from Nike_Metrics import metrics
+
+
+# One value in a Parquet column's type: blanks become null, text that is not a number
+# becomes null in a numeric column
+def _coerce(value, arrow_type):
+    import pyarrow as pa
+
+    if value is None or value == '':
+        return None
+    if pa.types.is_string(arrow_type):
+        return str(value)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number:
+        return None
+    return int(number) if pa.types.is_integer(arrow_type) else number
+
+
+# Streaming output for crawl results. Rows are buffered as plain tuples and
+# flushed to disk every batch_size rows, so memory stays flat however long the
+# crawl runs and everything written so far survives a crash. The finished
+# DataFrame is only built once, from the file, by to_dataframe().
+# Parquet columns are strings unless `types` maps them to an Arrow type ('float64', 'int64');
+# values are coerced to the column type, so the schema never depends on what a batch holds
+# (float prices from the JSON state next to '£55.00' or 'N/A' from the DOM).
+class RecordSink:
+    def __init__(self, path, columns, batch_size=1000, fmt=None, encoding='utf-8-sig', types=None):
+        self.path = path
+        self.columns = list(columns)
+        self.types = types or {}
+        self.batch_size = batch_size
+        self.fmt = fmt or ('parquet' if os.path.splitext(path)[1].lower() == '.parquet' else 'csv')
+        self.encoding = encoding
+        self.count = 0
+        self._buffer = []
+        self._file = None
+        self._writer = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Add one record (a dict keyed by column name); missing columns are left blank
+    def write(self, record):
+        self._buffer.append(tuple(record.get(column, '') for column in self.columns))
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    # Write the buffered rows to disk
+    def flush(self):
+        with metrics.stage('sink_write', sink=self.fmt):
+            if self.fmt == 'parquet':
+                self._flush_parquet()
+            else:
+                self._flush_csv()
+        self._buffer = []
+
+    def _flush_csv(self):
+        if self._file is None:
+            self._file = open(self.path, 'w', newline='', encoding=self.encoding)
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.columns)
+        self._writer.writerows(self._buffer)
+        self._file.flush()
+
+    def _flush_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._buffer and self._writer is not None:
+            return
+        if self._writer is None:
+            schema = pa.schema([(column, pa.type_for_alias(self.types.get(column, 'string'))) for column in self.columns])
+            self._writer = pq.ParquetWriter(self.path, schema)
+        schema = self._writer.schema
+        columns = zip(*self._buffer) if self._buffer else [() for _ in self.columns]
+        arrays = [pa.array([_coerce(value, field.type) for value in values], type=field.type)
+                  for field, values in zip(schema, columns)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+        elif self._writer is not None:
+            self._writer.close()
+        self._closed = True
+
+    # Finish writing and load the complete result set (pandas is only loaded here)
+    def to_dataframe(self):
+        import pandas as pd
+
+        self.close()
+        if self.fmt == 'parquet':
+            return pd.read_parquet(self.path)
+        return pd.read_csv(self.path, encoding=self.encoding)
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+from Nike_Frontier import product_key
+
+
+# Persistent per-product crawl state, keyed by style code, so repeated sweeps only
+# pay for what changed: fresh products are skipped outright, stale ones are fetched
+# with If-None-Match / If-Modified-Since, and a hash of the extracted record catches
+# pages that come back in full but with nothing new in them.
+# A product only counts as fetched once a complete record was extracted from it
+# (record_content); the last record is kept, so skipped products can still be written out.
+class RecrawlStore:
+    def __init__(self, path='crawl_state.sqlite', max_age=3600, commit_every=100):
+        self.max_age = max_age
+        self.commit_every = commit_every
+        self._pending = 0
+        self._validators = {}
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                style_code TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                last_fetched REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT
+            )""")
+        if 'record' not in [column for _, column, *_ in self.conn.execute("PRAGMA table_info(products)")]:
+            self.conn.execute("ALTER TABLE products ADD COLUMN record TEXT")
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, url):
+        row = self.conn.execute(
+            "SELECT url, last_fetched, etag, last_modified, content_hash FROM products WHERE style_code = ?",
+            (product_key(url),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('url', 'last_fetched', 'etag', 'last_modified', 'content_hash'), row))
+
+    def is_stale(self, url, now=None):
+        state = self.get(url)
+        return state is None or (now or time.time()) - state['last_fetched'] >= self.max_age
+
+    # Only the URLs whose last fetch is older than max_age (or that were never fetched)
+    def filter_stale(self, urls):
+        now = time.time()
+        return [url for url in urls if self.is_stale(url, now)]
+
+    # Validators for a conditional GET
+    def conditional_headers(self, url):
+        state = self.get(url)
+        headers = {}
+        if state and state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state and state['last_modified']:
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    # The server answered 304 Not Modified: just refresh the fetch time
+    def touch(self, url):
+        self.conn.execute("UPDATE products SET last_fetched = ? WHERE style_code = ?", (time.time(), product_key(url)))
+        self._written()
+
+    # A full response arrived: hold its validators for the next conditional GET. They are
+    # only stored with a complete record, so a page that could not be read is neither
+    # fresh nor answered with a 304 next time.
+    def record_response(self, url, etag=None, last_modified=None):
+        self._validators[product_key(url)] = (etag, last_modified)
+
+    # A complete record was extracted from the page (a string or a JSON-able record): mark
+    # the product fetched and keep the record. Returns True when it differs from last time.
+    def record_content(self, url, content):
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        state = self.get(url)
+        etag, last_modified = self._validators.pop(product_key(url), (None, None))
+        self.conn.execute("""
+            INSERT INTO products (style_code, url, last_fetched, etag, last_modified, content_hash, record)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(style_code) DO UPDATE SET
+                url = excluded.url, last_fetched = excluded.last_fetched, etag = excluded.etag,
+                last_modified = excluded.last_modified, content_hash = excluded.content_hash, record = excluded.record""",
+            (product_key(url), url, time.time(), etag, last_modified, content_hash, content))
+        self._written()
+        return state is None or state['content_hash'] != content_hash
+
+    # The last complete record of a product (decoded from JSON when it was a record), or None
+    def cached(self, url):
+        row = self.conn.execute("SELECT record FROM products WHERE style_code = ?", (product_key(url),)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return row[0]
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.conn.commit()
+            self._pending = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import json
+
+from Nike_Async_Fetcher import AsyncFetcher
+from Nike_Batch import scrape_in_browser, search_url
+from Nike_Frontier import DEFAULT_REGION, Frontier, REGION_CURRENCIES, STYLE_CODE_RE, product_key, region_of, \
+    regional_key, regional_url, style_code
+from Nike_Metrics import metrics
+from Nike_Parsers import get_parser
+from Nike_Record_Sink import RecordSink
+from Nike_Web_Crawler_Beaut import COLUMNS as PRODUCT_COLUMNS, extract_product
+
+COLUMNS = ["Style", "Region", "Currency"] + PRODUCT_COLUMNS
+
+# Value of one unit in EUR. A static fallback so the table can always be built offline;
+# pass today's rates with --rates for a comparison that means anything.
+DEFAULT_RATES = {'EUR': 1.0, 'GBP': 1.17, 'USD': 0.92, 'CAD': 0.67, 'AUD': 0.60, 'JPY': 0.0061}
+
+
+# Fail before crawling when the base currency or a region's currency has no exchange rate
+def check_rates(rates, regions, base):
+    needed = {base} | {REGION_CURRENCIES[region] for region in regions}
+    missing = sorted(needed - set(rates))
+    if missing:
+        raise ValueError(f"No exchange rate for {', '.join(missing)}; the rates cover {', '.join(sorted(rates))}")
+
+
+def complete(data):
+    return data["Name"] != 'N/A' and data["Price"] != 'N/A'
+
+
+# Read a style-code list: one product URL (any storefront) or bare style code per line
+def read_styles(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+# Fan every item out to every region and scrape them all through one fetcher (one connection
+# pool, one rate governor) and one frontier keyed by region and style code. Product URLs are
+# rewritten to each storefront; bare style codes are looked up with that storefront's search.
+# URLs are queued item by item, one per region, so every storefront is in flight at once.
+# Calls write(row) for each product scraped over HTTP; returns the URLs that still need a browser.
+async def _crawl_regions(items, regions, write, concurrency, per_host):
+    parser = get_parser()
+    frontier = Frontier(key=regional_key)
+    targets = []
+    searches = {}
+    missing = []
+
+    for item in items:
+        if STYLE_CODE_RE.fullmatch(item):
+            searches.update((search_url(item, region), item) for region in regions)
+        else:
+            targets += filter(None, (frontier.add(regional_url(item, region)) for region in regions))
+
+    def handle_search(url, html):
+        code = searches[url]
+        href = next((href for _, _, href in parser.parse_cards(html) if style_code(href) == code), None)
+        if href is None:
+            print(f"{code} is not listed on the {region_of(url)} storefront")
+            return
+        link = frontier.add(href)
+        if link is not None:
+            targets.append(link)
+
+    def handle_product(url, html):
+        data = extract_product(url, html, parser)
+        if complete(data):
+            write(data)
+        else:
+            missing.append(url)
+
+    async with AsyncFetcher(concurrency=concurrency, per_host=per_host) as fetcher:
+        for url in await fetcher.run(list(searches), handle_search):
+            print(f"Search failed for {searches[url]} on the {region_of(url)} storefront")
+        failed = await fetcher.run(targets, handle_product)
+    if failed:
+        print(f"{len(failed)} regional pages could not be fetched (not sold there, or failing); "
+              f"left out of the comparison")
+    return missing
+
+
+# One row per style code: each region's local price, the same prices converted to `base`,
+# the cheapest and dearest region, and the spread between them. rates maps a currency to
+# its value in any common unit (only the ratios matter).
+def compare_prices(rows, regions, base='GBP', rates=None):
+    import numpy as np
+    import pandas as pd
+    from Nike_Price_Normalizer import normalize_prices
+
+    rates = rates or DEFAULT_RATES
+    check_rates(rates, regions, base)
+    df = pd.DataFrame(rows, columns=["Style", "Region", "Currency", "Name", "Price"])
+    df['Local'] = normalize_prices(df['Price'])['current_price'].to_numpy()
+    df['Converted'] = (df['Local'] * df['Currency'].map(rates) / rates[base]).round(2)
+    # Names are localised; take the one from the first region listed
+    df = df.assign(order=df['Region'].map({region: i for i, region in enumerate(regions)})).sort_values('order')
+    wide = df.drop_duplicates(['Style', 'Region']).set_index(['Style', 'Region'])
+
+    local = wide['Local'].unstack().reindex(columns=regions)
+    converted = wide['Converted'].unstack().reindex(columns=regions)
+    priced = converted.notna().any(axis=1)
+    table = pd.concat([df.groupby('Style')['Name'].first(), local, converted.add_suffix(f'_{base}')], axis=1)
+    table['Cheapest'] = converted.fillna(np.inf).idxmin(axis=1).where(priced)
+    table['Dearest'] = converted.fillna(-np.inf).idxmax(axis=1).where(priced)
+    table['Spread_pct'] = ((converted.max(axis=1) / converted.min(axis=1) - 1) * 100).round(1)
+    return table.rename_axis('Style').reset_index()
+
+
+# Crawl one list of products across several storefronts in a single pass and join the
+# results. Every regional product row is streamed to `prices` as it arrives (CSV or Parquet
+# by extension); the currency-normalized comparison is written to `output` at the end.
+def run_regions(items, regions, output='region_comparison.csv', prices='region_prices.csv', base='GBP', rates=None,
+                concurrency=16, per_host=4, pool_size=4, use_browser=True):
+    check_rates(rates or DEFAULT_RATES, regions, base)
+    sink = RecordSink(prices, COLUMNS, encoding='utf-8-sig')
+    rows = []
+
+    def write(data):
+        region = region_of(data["Product"])
+        row = dict(data, Style=product_key(data["Product"]), Region=region, Currency=REGION_CURRENCIES.get(region))
+        sink.write(row)
+        rows.append((row["Style"], region, row["Currency"], row["Name"], row["Price"]))
+        metrics.count('region_pages', region=region)
+
+    missing = asyncio.run(_crawl_regions(items, regions, write, concurrency, per_host))
+
+    if missing and use_browser:
+        from Nike_Browser_Pool import BrowserPool
+        from Nike_Lean_Browser import block_resources, lean_options
+
+        print(f"Rendering {len(missing)} pages in the browser pool")
+        pool = BrowserPool(size=pool_size, options_factory=lean_options, setup=block_resources)
+        for data in pool.map(scrape_in_browser, missing):
+            if data and complete(data):
+                write(data)
+
+    sink.close()
+    table = compare_prices(rows, regions, base, rates)
+    if output.lower().endswith('.parquet'):
+        table.to_parquet(output, index=False)
+    else:
+        table.to_csv(output, index=False, encoding='utf-8-sig')
+    print(f"Scraped {sink.count} regional prices for {len(table)} products across {len(regions)} storefronts; "
+          f"comparison in {base} written to {output}")
+    metrics.report()
+    return table
+
+
+# Regression check on prices as the DOM fallback reads them: one product at 99.99 GBP, and
+# 1299.99 EUR written the French and German way must convert to the same base price
+def check_comparison():
+    rows = [("DD1391-103", 'gb', 'GBP', "Dunk Low", 99.99),
+            ("DD1391-103", 'fr', 'EUR', "Dunk Low", '1\u202f299,99\u00a0€'),
+            ("DD1391-103", 'de', 'EUR', "Dunk Low", '1.299,99 €'),
+            ("DD1391-103", 'us', 'USD', "Dunk Low", '$1,299.99')]
+    rates = {'EUR': 1.0, 'GBP': 1.2, 'USD': 0.9}
+    row = compare_prices(rows, ['gb', 'fr', 'de', 'us'], 'GBP', rates).iloc[0]
+    expected = {'gb': 99.99, 'fr': 1299.99, 'de': 1299.99, 'us': 1299.99, 'gb_GBP': 99.99, 'fr_GBP': 1083.32,
+                'de_GBP': 1083.32, 'us_GBP': 974.99, 'Cheapest': 'gb', 'Dearest': 'fr', 'Spread_pct': 983.4}
+    wrong = {column: row[column] for column, value in expected.items()
+             if (row[column] != value if isinstance(value, str) else abs(row[column] - value) > 0.011)}
+    if wrong:
+        raise AssertionError(f"compare_prices gave {wrong}, expected {expected}")
+    print("compare_prices check passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl the same products on several Nike storefronts and compare prices")
+    parser.add_argument("styles", nargs="?", help="file with one product URL or style code per line")
+    parser.add_argument("--regions", nargs="+", default=[DEFAULT_REGION, 'us', 'fr', 'de'],
+                        choices=sorted(REGION_CURRENCIES), metavar="REGION",
+                        help=f"storefronts to crawl: {', '.join(sorted(REGION_CURRENCIES))}")
+    parser.add_argument("--output", default="region_comparison.csv", help="comparison table (.csv or .parquet)")
+    parser.add_argument("--prices", default="region_prices.csv", help="every regional price row (.csv or .parquet)")
+    parser.add_argument("--base", default="GBP", help="currency the comparison is normalized to")
+    parser.add_argument("--rates", help='JSON file of exchange rates, e.g. {"EUR": 1.0, "GBP": 1.17, "USD": 0.92}')
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4, help="browsers for pages that need rendering")
+    parser.add_argument("--no-browser", action="store_true", help="skip pages that cannot be read over plain HTTP")
+    parser.add_argument("--check", action="store_true", help="only run the comparison regression check")
+    args = parser.parse_args()
+
+    if args.check:
+        check_comparison()
+        return
+    if not args.styles:
+        parser.error("a styles file is required")
+    rates = None
+    if args.rates:
+        with open(args.rates, encoding='utf-8') as f:
+            rates = json.load(f)
+    try:
+        check_rates(rates or DEFAULT_RATES, args.regions, args.base)
+    except ValueError as e:
+        parser.error(str(e))
+    run_regions(read_styles(args.styles), args.regions, output=args.output, prices=args.prices, base=args.base,
+                rates=rates, concurrency=args.concurrency, per_host=args.per_host, pool_size=args.pool_size,
+                use_browser=not args.no_browser)
+
+
+if __name__ == "__main__":
+    main()
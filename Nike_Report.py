@@ -0,0 +1,236 @@
+import argparse
+import hashlib
+import html
+import os
+import time
+from datetime import date, timedelta
+
+import matplotlib
+matplotlib.use('Agg')  # render straight to files; never needs a display
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from Nike_Metrics import metrics
+from Nike_Price_History import schemas
+
+REPORT_DIR = 'report'
+HIST_BINS = 30
+MAX_CATEGORIES = 8  # histogram lines drawn; the rest are folded into 'Other'
+
+
+def _save(fig, out_dir, name):
+    path = os.path.join(out_dir, name)
+    fig.savefig(path, dpi=110, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+# Price distribution per category as one step line each, on shared bins, instead of one bar per product
+def plot_category_histogram(prices, categories, out_dir, name='price_histogram_by_category.png', title='Price Distribution by Category'):
+    frame = pd.DataFrame({'price': prices, 'category': pd.Series(categories).fillna('').replace('', 'Uncategorised').to_numpy()})
+    frame = frame[frame['price'].notna()]
+    fig, ax = plt.subplots(figsize=(12, 6))
+    if len(frame):
+        edges = np.histogram_bin_edges(frame['price'], bins=HIST_BINS)
+        largest = frame['category'].value_counts().index[:MAX_CATEGORIES]
+        frame.loc[~frame['category'].isin(largest), 'category'] = 'Other'
+        bins = np.clip(np.searchsorted(edges, frame['price'], side='right') - 1, 0, HIST_BINS - 1)
+        counts = pd.crosstab(frame['category'], bins).reindex(columns=range(HIST_BINS), fill_value=0)
+        for category, row in counts.iterrows():
+            ax.stairs(row.to_numpy(), edges, label=f"{category} ({row.sum()})")
+        ax.legend()
+    ax.set_title(title)
+    ax.set_xlabel('Price')
+    ax.set_ylabel('Products')
+    return _save(fig, out_dir, name)
+
+
+# Horizontal bars for the first `top` rows of a ranked table
+def plot_top(table, label_col, value_col, out_dir, name, title, xlabel):
+    fig, ax = plt.subplots(figsize=(12, max(3, 0.35 * len(table) + 1)))
+    ax.barh(table[label_col].astype(str).str.slice(0, 60)[::-1], table[value_col][::-1])
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    return _save(fig, out_dir, name)
+
+
+# Files for one crawl's results (the DataFrame a crawler just wrote), without a display:
+# the price histogram by category, and the top-N products by discount (or the cheapest ones
+# when there is no discount column) as a table and a chart. Returns the written paths.
+# Prices and discounts are coerced to numbers first: an empty crawl leaves them as object columns.
+def render_prices(df, out_dir=REPORT_DIR, name_col='Name', price_col='Price_Clean', category_col=None,
+                  discount_col=None, top=20):
+    os.makedirs(out_dir, exist_ok=True)
+    df = df.assign(**{column: pd.to_numeric(df[column], errors='coerce') for column in (price_col, discount_col) if column})
+    categories = df[category_col] if category_col else pd.Series([''] * len(df))
+    paths = [plot_category_histogram(df[price_col].to_numpy(dtype=float), categories.to_numpy(), out_dir)]
+    if discount_col:
+        ranked = df[df[discount_col] > 0].nlargest(top, discount_col)
+        title, value_col, xlabel, stem = f'Top {top} Discounts', discount_col, 'Discount (%)', 'top_discounts'
+    else:
+        ranked = df[df[price_col].notna()].nsmallest(top, price_col)
+        title, value_col, xlabel, stem = f'{top} Cheapest Products', price_col, 'Price', 'cheapest'
+    ranked.to_csv(os.path.join(out_dir, f'{stem}.csv'), index=False)
+    paths.append(os.path.join(out_dir, f'{stem}.csv'))
+    if len(ranked):
+        paths.append(plot_top(ranked, name_col, value_col, out_dir, f'{stem}.png', title, xlabel))
+    print(f"Report written to {out_dir}: {', '.join(os.path.basename(path) for path in paths)}")
+    return paths
+
+
+# Per-product summary of one date partition (min, max and last price, snapshot count),
+# cached next to the report and rebuilt only when files are added to the partition. Past
+# dates never change, so a report costs one small read per day however many snapshots
+# each day holds.
+def _day_rollup(history_root, day, cache_dir):
+    directory = os.path.join(history_root, f'date={day}')
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.parquet'))
+    signature = hashlib.blake2b('\n'.join(files).encode(), digest_size=8).hexdigest()
+    cached = os.path.join(cache_dir, f'{day}-{signature}.parquet')
+    if os.path.exists(cached):
+        return pq.read_table(cached)
+
+    schema = schemas()[0]
+    table = pa.concat_tables(pq.read_table(os.path.join(directory, name), schema=schema) for name in files)
+    table = table.sort_by('timestamp')
+    rollup = table.group_by('style_code', use_threads=False).aggregate([
+        ('price', 'min'), ('price', 'max'), ('price', 'last'), ('price', 'count'),
+        ('name', 'last'), ('category', 'last'), ('currency', 'last'),
+    ])
+    rollup = rollup.append_column('date', pa.array([day] * len(rollup), pa.string()))
+    for stale in os.listdir(cache_dir):
+        if stale.startswith(f'{day}-'):
+            os.remove(os.path.join(cache_dir, stale))
+    pq.write_table(rollup, cached)
+    return rollup
+
+
+# Daily per-product rollups for the last `days` days (all history when None)
+def daily_rollups(history_root='price_history', days=90, cache_dir=None):
+    cache_dir = cache_dir or os.path.join(REPORT_DIR, '.rollups')
+    os.makedirs(cache_dir, exist_ok=True)
+    first = (date.today() - timedelta(days=days - 1)).isoformat() if days else ''
+    dates = sorted(name[len('date='):] for name in os.listdir(history_root) if name.startswith('date=')) \
+        if os.path.isdir(history_root) else []
+    tables = [_day_rollup(history_root, day, cache_dir) for day in dates if day >= first]
+    if not tables:
+        return pd.DataFrame(columns=['style_code', 'date', 'price_min', 'price_max', 'price_last', 'price_count',
+                                     'name_last', 'category_last', 'currency_last'])
+    return pa.concat_tables(tables).to_pandas()
+
+
+# Downsample each product's daily series to at most `points` buckets of consecutive days
+def downsample(rollups, points=200):
+    days = pd.to_datetime(rollups['date'])
+    span = (days - days.min()).dt.days
+    width = max(1, -(-(int(span.max()) + 1) // points)) if len(rollups) else 1
+    bucketed = rollups.assign(bucket=span // width).sort_values('date')
+    return bucketed.groupby(['style_code', 'bucket'], sort=False).agg(
+        date=('date', 'first'), price_min=('price_min', 'min'), price_max=('price_max', 'max'),
+        price_last=('price_last', 'last'), snapshots=('price_count', 'sum')).reset_index().drop(columns='bucket')
+
+
+# Latest price per product, the highest price seen in the window and the discount between them
+def latest_prices(rollups):
+    ordered = rollups.sort_values('date')
+    latest = ordered.groupby('style_code').agg(
+        name=('name_last', 'last'), category=('category_last', 'last'), currency=('currency_last', 'last'),
+        price=('price_last', 'last'), high=('price_max', 'max'), last_seen=('date', 'last')).reset_index()
+    latest['discount_pct'] = ((1 - latest['price'] / latest['high']) * 100).round(1)
+    return latest
+
+
+def _write_index(out_dir, sections):
+    parts = ['<html><head><meta charset="utf-8"><title>Nike price report</title></head><body>',
+             f'<h1>Nike price report</h1><p>Generated {html.escape(time.strftime("%Y-%m-%d %H:%M:%S"))}</p>']
+    for heading, content in sections:
+        parts.append(f'<h2>{html.escape(heading)}</h2>{content}')
+    parts.append('</body></html>')
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(parts))
+
+
+# Report over the price history, rendered to files: price histogram by category, top-N
+# discounts (table and chart), downsampled trends of the most discounted products, the
+# downsampled series of every product as Parquet, and an index.html tying them together.
+# Everything is aggregated from the cached daily rollups, so generation time depends on the
+# number of products and days in the window, not on how many snapshots the history holds.
+def build_report(history_root='price_history', out_dir=REPORT_DIR, days=90, top=20, trend_products=10, points=200):
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    with metrics.stage('report'):
+        rollups = daily_rollups(history_root, days, os.path.join(out_dir, '.rollups'))
+        if rollups.empty:
+            print(f"No price history in {history_root}")
+            return None
+        latest = latest_prices(rollups)
+        series = downsample(rollups, points)
+        pq.write_table(pa.Table.from_pandas(series, preserve_index=False), os.path.join(out_dir, 'series.parquet'))
+
+        histogram = plot_category_histogram(latest['price'].to_numpy(dtype=float), latest['category'].to_numpy(), out_dir)
+        discounts = latest[latest['discount_pct'] > 0].nlargest(top, 'discount_pct')
+        discounts.to_csv(os.path.join(out_dir, 'top_discounts.csv'), index=False)
+        sections = [('Price distribution by category', f'<img src="{os.path.basename(histogram)}">')]
+        if len(discounts):
+            chart = plot_top(discounts.assign(label=discounts['name'].fillna(discounts['style_code'])), 'label',
+                             'discount_pct', out_dir, 'top_discounts.png', f'Top {top} Discounts vs. Highest Price Seen',
+                             'Discount (%)')
+            sections.append((f'Top {top} discounts', f'<img src="{os.path.basename(chart)}">' + discounts[
+                ['style_code', 'name', 'category', 'price', 'high', 'discount_pct', 'currency']].to_html(index=False)))
+
+        # Trends only for the products worth looking at, never one line per product
+        trend_codes = list(discounts['style_code'][:trend_products]) or \
+            list(latest.nlargest(trend_products, 'high')['style_code'])
+        trends = series[series['style_code'].isin(trend_codes)]
+        fig, ax = plt.subplots(figsize=(12, 6))
+        for code, rows in trends.groupby('style_code'):
+            ax.plot(pd.to_datetime(rows['date']), rows['price_last'], marker='.', label=code)
+            ax.fill_between(pd.to_datetime(rows['date']), rows['price_min'], rows['price_max'], alpha=0.15)
+        ax.set_title('Price Trend Over Time')
+        ax.set_ylabel('Price')
+        if len(trend_codes):
+            ax.legend(fontsize='small')
+        trend = _save(fig, out_dir, 'price_trends.png')
+        sections.append(('Price trends', f'<img src="{os.path.basename(trend)}"><p>Every product: '
+                                         f'<a href="series.parquet">series.parquet</a></p>'))
+        _write_index(out_dir, sections)
+
+    print(f"Report for {len(latest)} products over {rollups['date'].nunique()} days written to "
+          f"{os.path.join(out_dir, 'index.html')} in {time.perf_counter() - start:.2f}s")
+    return os.path.join(out_dir, 'index.html')
+
+
+# Regression check: an empty crawl (columns but no rows, all object dtype) still renders
+# the histogram and an empty ranking, with and without a discount column
+def check_empty_crawl(out_dir=os.path.join(REPORT_DIR, 'check')):
+    df = pd.DataFrame(columns=['Name', 'Price', 'Price_Clean', 'Discount (%)'])
+    for discount_col, stem in (('Discount (%)', 'top_discounts'), (None, 'cheapest')):
+        paths = render_prices(df, out_dir, discount_col=discount_col)
+        names = [os.path.basename(path) for path in paths]
+        if names != ['price_histogram_by_category.png', f'{stem}.csv']:
+            raise AssertionError(f"render_prices on an empty crawl wrote {names}")
+    print("Empty crawl check passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a price report from the price history, without a display")
+    parser.add_argument("--history", default="price_history")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--days", type=int, default=90, help="days of history to include (0: all)")
+    parser.add_argument("--top", type=int, default=20, help="rows in the discount table")
+    parser.add_argument("--trends", type=int, default=10, help="products drawn in the trend chart")
+    parser.add_argument("--points", type=int, default=200, help="maximum points per product series")
+    parser.add_argument("--check", action="store_true", help="only run the empty-crawl regression check")
+    args = parser.parse_args()
+    if args.check:
+        check_empty_crawl(os.path.join(args.out, 'check'))
+        return
+    build_report(args.history, args.out, days=args.days or None, top=args.top, trend_products=args.trends,
+                 points=args.points)
+
+
+if __name__ == "__main__":
+    main()
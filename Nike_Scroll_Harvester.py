@@ -0,0 +1,68 @@
+import time
+
+from Nike_Frontier import Frontier
+from Nike_Metrics import metrics
+from Nike_Parsers import CARD_LINK_SELECTOR, CARD_PRICE_SELECTOR, CARD_SELECTOR, CARD_TITLE_SELECTOR
+
+# Read every card from index `start` onwards in a single round trip to the browser
+READ_CARDS_JS = f"""
+const cards = document.querySelectorAll('{CARD_SELECTOR}');
+const out = [];
+for (let i = arguments[0]; i < cards.length; i++) {{
+    const title = cards[i].querySelector('{CARD_TITLE_SELECTOR}');
+    const price = cards[i].querySelector('{CARD_PRICE_SELECTOR}');
+    const link = cards[i].querySelector('{CARD_LINK_SELECTOR}');
+    out.push([title ? title.textContent.trim() : '', price ? price.textContent.trim() : '', link ? link.href : '']);
+}}
+return [cards.length, out];
+"""
+COUNT_CARDS_JS = f"return document.querySelectorAll('{CARD_SELECTOR}').length;"
+SCROLL_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+
+# Scroll an infinite search grid and yield each batch of new (title, price, link) cards
+# as soon as it appears, instead of reading the grid once at the end.
+#   - after each scroll it polls the card count and moves on the moment it grows
+#   - the wait limit adapts to how long new cards have actually been taking to load
+#   - it stops once the count has not grown for `patience` scrolls in a row
+#   - the seen-index is bounded: a Bloom filter sized for max_seen cards when given
+#   - max_cards caps how many cards are harvested in total
+def harvest_cards(driver, max_cards=None, max_seen=None, patience=2, min_wait=0.3, max_wait=5.0, poll=0.1):
+    frontier = Frontier(capacity=max_seen) if max_seen else Frontier()
+    read_from = 0
+    harvested = 0
+    load_time = 1.0  # running estimate of how long a scroll takes to bring in new cards
+    stalls = 0
+
+    while True:
+        count, rows = driver.execute_script(READ_CARDS_JS, read_from)
+        read_from = count
+        batch = []
+        for title, price, href in rows:
+            link = frontier.add(href) if href else None
+            if link is None:
+                continue
+            batch.append((title, price, link))
+            harvested += 1
+            if max_cards and harvested >= max_cards:
+                break
+        if batch:
+            yield batch
+        if max_cards and harvested >= max_cards:
+            return
+
+        driver.execute_script(SCROLL_JS)
+        limit = min(max_wait, max(min_wait, 2.5 * load_time))
+        start = time.perf_counter()
+        while driver.execute_script(COUNT_CARDS_JS) <= count and time.perf_counter() - start < limit:
+            time.sleep(poll)
+        waited = time.perf_counter() - start
+        metrics.observe('browser_wait', waited, step='scroll')
+
+        if driver.execute_script(COUNT_CARDS_JS) > count:
+            load_time = 0.7 * load_time + 0.3 * waited
+            stalls = 0
+        else:
+            stalls += 1
+            if stalls >= patience:
+                return
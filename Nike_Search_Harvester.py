@@ -0,0 +1,55 @@
+import asyncio
+
+import aiohttp
+
+from Nike_Async_Fetcher import AsyncFetcher
+from Nike_Metrics import metrics
+
+
+# Fetch one window of search result pages concurrently; a page that fails to load counts as empty
+async def _fetch_window(fetcher, urls):
+    async def fetch(url):
+        try:
+            return await fetcher.fetch(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Failed to fetch {url}: {e}")
+            metrics.count('timeouts' if isinstance(e, asyncio.TimeoutError) else 'fetch_errors', source='http')
+            return None
+
+    return await asyncio.gather(*(fetch(url) for url in urls))
+
+
+# Stream products from paginated search results.
+#   url_for(page) -> search URL for that page number
+#   parse(html)   -> list of products on the page
+#   key(product)  -> identity used to spot repeats
+# Pages are fetched `window` at a time, in parallel, and handled in page order.
+# Harvesting stops at the first page that is empty or only repeats products
+# already seen (Nike serves the last page again past the end of the results).
+def harvest(url_for, parse, key, window=4, max_pages=100, concurrency=8, per_host=4):
+    loop = asyncio.new_event_loop()
+    fetcher = AsyncFetcher(concurrency=concurrency, per_host=per_host)
+    loop.run_until_complete(fetcher.__aenter__())
+    seen = set()
+    try:
+        page = 1
+        while page <= max_pages:
+            pages = list(range(page, min(page + window, max_pages + 1)))
+            print(f"Scraping pages {pages[0]}-{pages[-1]}...")
+            htmls = loop.run_until_complete(_fetch_window(fetcher, [url_for(p) for p in pages]))
+            for number, html in zip(pages, htmls):
+                products = parse(html) if html else []
+                new = []
+                for product in products:
+                    product_key = key(product)
+                    if product_key not in seen:
+                        seen.add(product_key)
+                        new.append(product)
+                if not new:
+                    print(f"Page {number} returned no new products, stopping")
+                    return
+                yield from new
+            page += window
+    finally:
+        loop.run_until_complete(fetcher.__aexit__(None, None, None))
+        loop.close()
@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import csv
+import glob
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from multiprocessing import get_context
+
+from Nike_Async_Fetcher import AsyncFetcher
+from Nike_Frontier import Frontier, product_key
+from Nike_Metrics import metrics
+from Nike_Parsers import get_parser
+from Nike_Price_History import PriceHistory
+from Nike_Record_Sink import RecordSink
+from Nike_Web_Crawler_Beaut import COLUMNS, extract_product, search_product_urls
+
+
+# Shared work queue of product URLs in one SQLite file. Workers claim batches under a
+# write lock, so every URL goes to exactly one worker at a time; a claim that is not
+# completed within `lease` seconds (the worker died) goes back to the queue, and a URL
+# that fails max_attempts times is given up on. Several machines can share the queue
+# through a network drive; it is a stand-in for a proper broker.
+# Every sweep is a run with its own id: queuing a URL for a new run puts it back to
+# pending even if an earlier run already crawled it, and workers only claim their run's URLs.
+class WorkQueue:
+    def __init__(self, path='crawl_queue.sqlite', lease=600, max_attempts=3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                url TEXT PRIMARY KEY,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                leased_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )""")
+        if 'run' not in [column for _, column, *_ in self.conn.execute("PRAGMA table_info(tasks)")]:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN run TEXT")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS runs (run TEXT PRIMARY KEY, started_at REAL NOT NULL)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Register a new run (or an existing one, by id) and return its id
+    def start_run(self, run=None):
+        run = run or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.conn.execute("INSERT OR IGNORE INTO runs VALUES (?, ?)", (run, time.time()))
+        return run
+
+    # The run started last, which workers and merges default to
+    def latest_run(self):
+        row = self.conn.execute("SELECT run FROM runs ORDER BY started_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    # Queue canonical URLs for a run, one per style code. A URL queued by an earlier run
+    # starts over as pending; one already queued for this run is left alone.
+    # Returns how many were queued.
+    def add(self, urls, run):
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("""
+            INSERT INTO tasks (url, run) VALUES (?, ?)
+            ON CONFLICT (url) DO UPDATE SET state = 'pending', run = excluded.run, worker = NULL, leased_at = NULL,
+                                            attempts = 0
+            WHERE tasks.run IS NOT excluded.run""", ((url, run) for url in Frontier().filter(urls)))
+        self.conn.execute("COMMIT")
+        return self.conn.total_changes - before
+
+    # Lease up to n of a run's URLs to a worker: pending ones first, then expired leases
+    def claim(self, worker, n, run):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            urls = [url for url, in self.conn.execute("""
+                SELECT url FROM tasks
+                WHERE run = ? AND (state = 'pending' OR (state = 'leased' AND leased_at < ?))
+                ORDER BY state DESC, rowid LIMIT ?""", (run, now - self.lease, n))]
+            self.conn.executemany(
+                "UPDATE tasks SET state = 'leased', worker = ?, leased_at = ?, attempts = attempts + 1 WHERE url = ?",
+                ((worker, now, url) for url in urls))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return urls
+
+    def complete(self, urls):
+        self.conn.executemany("UPDATE tasks SET state = 'done' WHERE url = ?", ((url,) for url in urls))
+
+    # Failed URLs are retried by whichever worker claims them next, until max_attempts
+    def fail(self, urls):
+        self.conn.executemany(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END WHERE url = ?",
+            ((self.max_attempts, url) for url in urls))
+
+    # Put a dead worker's leases straight back, instead of waiting for them to expire.
+    # Returns how many URLs it held.
+    def release(self, worker):
+        before = self.conn.total_changes
+        self.conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END "
+            "WHERE state = 'leased' AND worker = ?", (self.max_attempts, worker))
+        return self.conn.total_changes - before
+
+    # Number of a run's URLs in each state, e.g. {'pending': 120, 'leased': 32, 'done': 848}
+    def counts(self, run):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM tasks WHERE run = ? GROUP BY state", (run,)))
+
+    def close(self):
+        self.conn.close()
+
+
+# Worker names are unique across machines sharing a queue, and name the worker's partition
+def worker_name(index=None):
+    return f"{socket.gethostname()}-{os.getpid()}" + (f"-{index}" if index is not None else '')
+
+
+# Each run writes its partitions to its own directory, so a merge never picks up an earlier run's
+def run_dir(out_dir, run):
+    return os.path.join(out_dir, run)
+
+
+def partition_path(out_dir, worker, fmt='csv'):
+    return os.path.join(out_dir, f"part-{worker}.{fmt}")
+
+
+# One worker: claim a batch of the run, fetch and parse it with its own fetcher and parser,
+# write the rows to its own partition and mark the batch done, until the run is drained.
+# Nothing is shared with other workers except the queue file.
+def run_worker(queue_path, out_dir, run, worker=None, fmt='csv', batch_size=64, concurrency=16, per_host=4,
+               mode='state', history_root=None):
+    worker = worker or worker_name()
+    out_dir = run_dir(out_dir, run)
+    os.makedirs(out_dir, exist_ok=True)
+    parser = get_parser()
+    sink = RecordSink(partition_path(out_dir, worker, fmt), COLUMNS, batch_size=batch_size, encoding='utf-8-sig')
+    history = PriceHistory(history_root) if history_root else None
+
+    async def crawl(queue):
+        async with AsyncFetcher(concurrency=concurrency, per_host=per_host) as fetcher:
+            while True:
+                urls = queue.claim(worker, batch_size, run)
+                if not urls:
+                    return
+                parsed = []
+                broken = []
+
+                def handle_page(url, html):
+                    try:
+                        data = extract_product(url, html, parser, mode=mode)
+                    except Exception as e:
+                        print(f"Failed to scrape product at {url}: {e}")
+                        broken.append(url)
+                        return
+                    sink.write(data)
+                    if history is not None:
+                        history.append(url, data["Price"], name=data["Name"], category=data["Category"] or None)
+                    parsed.append(url)
+
+                failed = await fetcher.run(urls, handle_page)
+                sink.flush()  # the batch is on disk before it is marked done
+                queue.complete(parsed)
+                queue.fail(failed + broken)
+                metrics.count('shard_pages', len(parsed), worker=worker)
+
+    with WorkQueue(queue_path) as queue:
+        asyncio.run(crawl(queue))
+    sink.close()
+    if history is not None:
+        history.flush()
+    metrics.report()
+    return sink.count
+
+
+def _read_partition(path):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+
+
+# Stream every worker partition into one output file. A batch re-crawled after its worker
+# died can appear in two partitions; only the first row per style code is kept.
+def merge_partitions(out_dir, output):
+    seen = set()
+    sink = RecordSink(output, COLUMNS, encoding='utf-8-sig')
+    for path in sorted(glob.glob(os.path.join(out_dir, 'part-*'))):
+        for row in _read_partition(path):
+            key = product_key(row["Product"])
+            if key not in seen:
+                seen.add(key)
+                sink.write(row)
+    sink.close()
+    return sink
+
+
+# Coordinator for one machine: start a run, queue the URLs for it, start one worker process
+# per core, wait, then merge the run's partitions. Workers on other machines can join the run
+# with `python Nike_Shard_Crawl.py work`. A worker that exits with an error has its leases
+# released and its share picked up by a fresh round of workers, up to `restarts` times;
+# after that the run fails rather than merging a partial result.
+def run_sharded(urls, workers=None, queue_path='crawl_queue.sqlite', out_dir='shards', output='PriceList.csv',
+                fmt='csv', batch_size=64, concurrency=16, per_host=4, mode='state', history_root=None, restarts=1):
+    workers = workers or os.cpu_count() or 1
+    with WorkQueue(queue_path) as queue:
+        run = queue.start_run()
+        print(f"Run {run}: queued {queue.add(urls, run)} product URLs")
+
+    context = get_context('spawn')
+    start = time.perf_counter()
+    for round_ in range(restarts + 1):
+        names = [worker_name(round_ * workers + i) for i in range(workers)]
+        processes = [context.Process(target=run_worker, args=(queue_path, out_dir, run, name, fmt, batch_size,
+                                                              concurrency, per_host, mode, history_root))
+                     for name in names]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        crashed = [(name, process.exitcode) for name, process in zip(names, processes) if process.exitcode != 0]
+        with WorkQueue(queue_path) as queue:
+            for name, exitcode in crashed:
+                print(f"Worker {name} exited with code {exitcode}; {queue.release(name)} leased URLs re-queued")
+            counts = queue.counts(run)
+        if not crashed or not counts.get('pending'):
+            break
+    elapsed = time.perf_counter() - start
+
+    if counts.get('pending') or counts.get('leased'):
+        raise RuntimeError(f"Run {run} is incomplete after {restarts + 1} rounds of workers: {counts}. "
+                           f"Finish it with `work --run {run}`, then `merge --run {run}`")
+    sink = merge_partitions(run_dir(out_dir, run), output)
+    print(f"{workers} workers crawled {counts.get('done', 0)} pages in {elapsed:.1f}s "
+          f"({counts.get('done', 0) / elapsed:.1f} pages/s); {counts.get('failed', 0)} failed, "
+          f"{sink.count} products merged into {sink.path}")
+    return sink
+
+
+def _read_urls(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl product pages with several worker processes sharing a queue")
+    parser.add_argument("--queue", default="crawl_queue.sqlite", help="SQLite work queue shared by all workers")
+    parser.add_argument("--out-dir", default="shards", help="directory for the per-worker partitions")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="partition format")
+    parser.add_argument("--batch-size", type=int, default=64, help="URLs a worker claims at a time")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per worker")
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--mode", choices=["state", "dom"], default="state",
+                        help="'dom' skips the embedded JSON state and parses the markup")
+    parser.add_argument("--history", help="also append to this price history directory")
+    parser.add_argument("--run", help="run id for enqueue/work/merge (enqueue: a new run; work, merge: the latest)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, text in (("run", "queue URLs, crawl them with local workers and merge"),
+                       ("enqueue", "only add URLs to the queue")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--search", nargs="*", default=[], help="search terms whose results are queued")
+        command.add_argument("--urls", help="file with one product URL per line")
+        if name == "run":
+            command.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+            command.add_argument("--output", default="PriceList.csv")
+    commands.add_parser("work", help="run one worker until the queue is drained")
+    merge = commands.add_parser("merge", help="merge the worker partitions into one file")
+    merge.add_argument("--output", default="PriceList.csv")
+    args = parser.parse_args()
+
+    if args.command in ("run", "enqueue"):
+        urls = _read_urls(args.urls) if args.urls else []
+        for term in args.search:
+            urls += search_product_urls(term)
+        if args.command == "enqueue":
+            with WorkQueue(args.queue) as queue:
+                run = queue.start_run(args.run)
+                print(f"Run {run}: queued {queue.add(urls, run)} product URLs: {queue.counts(run)}")
+        else:
+            run_sharded(urls, workers=args.workers, queue_path=args.queue, out_dir=args.out_dir, output=args.output,
+                        fmt=args.format, batch_size=args.batch_size, concurrency=args.concurrency,
+                        per_host=args.per_host, mode=args.mode, history_root=args.history)
+    else:
+        with WorkQueue(args.queue) as queue:
+            run = args.run or queue.latest_run()
+        if run is None:
+            parser.error("no run in the queue; enqueue some URLs first")
+        if args.command == "work":
+            count = run_worker(args.queue, args.out_dir, run, fmt=args.format, batch_size=args.batch_size,
+                               concurrency=args.concurrency, per_host=args.per_host, mode=args.mode,
+                               history_root=args.history)
+            print(f"Wrote {count} products for run {run}")
+        else:
+            sink = merge_partitions(run_dir(args.out_dir, run), args.output)
+            print(f"Merged {sink.count} products of run {run} into {sink.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The fetch/parse path every crawler shares, then the entry points built on it
+CORE_MODULES = ['Nike_Frontier', 'Nike_Metrics', 'Nike_Rate_Governor', 'Nike_Async_Fetcher', 'Nike_Parsers',
+                'Nike_State_Extractor', 'Nike_Record_Sink', 'Nike_Recrawl_Store', 'Nike_Page_Archive']
+ENTRY_MODULES = ['Nike_Web_Crawler_Beaut', 'Nike_web_crawler_updated', 'Nike_Batch', 'Nike_Shard_Crawl',
+                 'Nike_Region_Crawl', 'Nike_Price_Watch', 'Nike_Browser_Pool', 'Nike_Web_Crawler_Sel']
+
+# Libraries that a plain HTTP sweep should not have to load
+HEAVY = ['pandas', 'numpy', 'pyarrow', 'matplotlib', 'seaborn', 'selenium', 'webdriver_manager', 'bs4']
+
+# Runs in a fresh interpreter: import one module, report how long that took, the peak RSS
+# and which heavy libraries came with it
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+except ImportError:  # Windows
+    import psutil
+    peak_mb = psutil.Process().memory_info().peak_wset / 2 ** 20
+print(json.dumps({{'import_s': seconds, 'peak_mb': peak_mb,
+                  'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+# Cold start of one module: interpreter launch plus import, in a new process each round
+def measure(module, rounds=5):
+    here = os.path.dirname(os.path.abspath(__file__))
+    walls, imports, peaks, heavy = [], [], [], []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)], cwd=here,
+                              capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        if done.returncode != 0:
+            return {'module': module, 'error': done.stderr.strip().splitlines()[-1]}
+        result = json.loads(done.stdout.strip().splitlines()[-1])
+        walls.append(wall)
+        imports.append(result['import_s'])
+        peaks.append(result['peak_mb'])
+        heavy = result['heavy']
+    return {
+        'module': module,
+        'cold_start_ms': statistics.median(walls) * 1000,
+        'import_ms': statistics.median(imports) * 1000,
+        'peak_rss_mb': statistics.median(peaks),
+        'heavy': heavy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time and import memory of the crawler modules")
+    parser.add_argument("modules", nargs="*", help="modules to measure (default: the core path and every entry point)")
+    parser.add_argument("--rounds", type=int, default=5, help="fresh interpreters per module; the median is reported")
+    parser.add_argument("--json", help="also write the results to this file, for comparing runs")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'module':<26} {'cold ms':>8} {'import ms':>9} {'peak MB':>8}  heavy libraries loaded")
+    for module in args.modules or CORE_MODULES + ENTRY_MODULES:
+        result = measure(module, args.rounds)
+        results.append(result)
+        if 'error' in result:
+            print(f"{module:<26} failed: {result['error']}")
+            continue
+        print(f"{module:<26} {result['cold_start_ms']:>8.0f} {result['import_ms']:>9.0f} {result['peak_rss_mb']:>8.1f}  "
+              f"{', '.join(result['heavy']) or '-'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
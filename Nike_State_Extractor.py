@@ -0,0 +1,174 @@
+import json
+import re
+
+from Nike_Async_Fetcher import fetch_pages
+from Nike_Frontier import style_code as style_code_from_url
+from Nike_Metrics import metrics
+from Nike_Price_Normalizer import current_price
+
+# Embedded state blobs Nike ships with its pages
+NEXT_DATA_RE = re.compile(r'<script[^>]*\bid="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+REDUX_STATE_RE = re.compile(r'window\.INITIAL_REDUX_STATE\s*=\s*')
+LD_JSON_RE = re.compile(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', re.S)
+
+NAME_KEYS = ('fullTitle', 'title', 'productName', 'name')
+CURRENT_PRICE_KEYS = ('currentPrice', 'salePrice', 'price')
+FULL_PRICE_KEYS = ('initialPrice', 'fullPrice', 'msrp')
+
+
+# Return every JSON state object embedded in the page
+def find_state(html):
+    blobs = []
+    for match in NEXT_DATA_RE.finditer(html):
+        blobs.append(match.group(1))
+    for match in LD_JSON_RE.finditer(html):
+        blobs.append(match.group(1))
+    states = []
+    for blob in blobs:
+        try:
+            states.append(json.loads(blob))
+        except ValueError:
+            continue
+    match = REDUX_STATE_RE.search(html)
+    if match:
+        try:
+            states.append(json.JSONDecoder().raw_decode(html, match.end())[0])
+        except ValueError:
+            pass
+    return states
+
+
+# Iterate over every dict nested anywhere inside a JSON value
+def _walk(value):
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+# Look for the first of keys in node or one level down (e.g. productInfo.title, prices.currentPrice)
+def _lookup(node, keys):
+    for key in keys:
+        value = node.get(key)
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            return value
+    for child in node.values():
+        if isinstance(child, dict):
+            for key in keys:
+                value = child.get(key)
+                if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                    return value
+    return None
+
+
+def _product_from_state(states, style_code):
+    # Next.js / Redux state: the product entry is the dict carrying its styleColor. When the
+    # URL names a style code, only that product will do: the state also holds related and
+    # recommended products, and without a match the LD+JSON / DOM readers take over.
+    for state in states:
+        for node in _walk(state):
+            code = node.get('styleColor')
+            if isinstance(code, str) and (style_code is None or code == style_code):
+                return node
+    return None
+
+
+def _product_from_ld_json(states, style_code):
+    # LD+JSON Product blocks: a PDP can embed related products too, so when the URL names a
+    # style code only the block whose sku or productID carries it will do
+    for state in states:
+        for node in _walk(state):
+            if node.get('@type') == 'Product' and (
+                    style_code is None or style_code in (node.get('sku'), node.get('productID'))):
+                return node
+    return None
+
+
+def _breadcrumbs(states):
+    for state in states:
+        for node in _walk(state):
+            if node.get('@type') == 'BreadcrumbList':
+                items = sorted(node.get('itemListElement') or [], key=lambda item: item.get('position', 0))
+                names = [item.get('name') or (item.get('item') or {}).get('name') for item in items]
+                return [name for name in names if name]
+    for state in states:
+        for node in _walk(state):
+            crumbs = node.get('breadcrumbs')
+            if isinstance(crumbs, list) and crumbs and all(isinstance(c, dict) for c in crumbs):
+                return [c.get('label') or c.get('name') for c in crumbs if c.get('label') or c.get('name')]
+    return []
+
+
+# Read name, price, sale price, currency, style code and breadcrumbs from the page's
+# embedded JSON state. Returns None when the page carries no usable state.
+def extract_state(html, url=None):
+    with metrics.stage('parse', source='state', page='pdp'):
+        data = _read_state(html, url)
+    if data is None:
+        metrics.count('selector_misses', selector='state', source='state')
+    return data
+
+
+def _read_state(html, url):
+    states = find_state(html)
+    if not states:
+        return None
+
+    style_code = style_code_from_url(url)
+    product = _product_from_state(states, style_code)
+    ld_product = _product_from_ld_json(states, style_code)
+    if product is None and ld_product is None:
+        return None
+
+    name = current = full = currency = None
+    if product is not None:
+        style_code = product.get('styleColor') or style_code
+        name = _lookup(product, NAME_KEYS)
+        current = current_price(_lookup(product, CURRENT_PRICE_KEYS))
+        full = current_price(_lookup(product, FULL_PRICE_KEYS))
+        currency = _lookup(product, ('currency', 'priceCurrency'))
+    if ld_product is not None:
+        offers = ld_product.get('offers') or {}
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        name = name or ld_product.get('name')
+        current = current if current is not None else current_price(offers.get('price') or offers.get('lowPrice'))
+        currency = currency or offers.get('priceCurrency')
+        style_code = style_code or ld_product.get('sku')
+
+    if not name or current is None:
+        return None
+
+    full = full if full is not None else current
+    return {
+        'name': name,
+        'price': full,
+        'sale_price': current if current < full else None,
+        'currency': currency,
+        'style_code': style_code,
+        'categories': _breadcrumbs(states),
+    }
+
+
+# Fetch pages with plain HTTP and read them in state mode. Returns the extracted
+# records keyed by URL, plus the URLs that failed or had no usable state and still
+# need a browser. With a RecrawlStore, products that are still fresh or answered
+# 304 are left out of both; the caller records what it extracted with
+# store.record_content and writes the skipped ones from store.cached.
+def scrape_state(urls, concurrency=16, per_host=4, store=None):
+    found = {}
+    missing = []
+
+    def handle_page(url, html):
+        data = extract_state(html, url)
+        if not data:
+            missing.append(url)
+        else:
+            found[url] = data
+
+    missing += fetch_pages(urls, handle_page, concurrency=concurrency, per_host=per_host, store=store)
+    return found, missing
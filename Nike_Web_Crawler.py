@@ -1,21 +1,24 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from chromedriver_py import binary_path
-import pandas as pd
+from selenium.common.exceptions import TimeoutException
 import time
 from datetime import datetime
 import pytz
 
-svc = Service(executable_path=binary_path)
+from Nike_Browser_Pool import BrowserPool
+from Nike_Frontier import Frontier
+from Nike_Lean_Browser import FieldsMissing, block_resources, lean_options, read_fields
+from Nike_Metrics import metrics
+from Nike_Price_Alerts import alert_stream
+from Nike_Price_History import PriceHistory
+from Nike_Record_Sink import RecordSink
+from Nike_Recrawl_Store import RecrawlStore
+from Nike_State_Extractor import extract_state, scrape_state
 
-# Get the website using the Chrome web driver
-browser = webdriver.Chrome(service=svc)
+# Number of Chrome workers and how many pages each one serves before it is replaced
+POOL_SIZE = 4
+PAGES_PER_BROWSER = 50
 
-# Create an empty DataFrame to store the results
-df = pd.DataFrame(columns=["Product", "Name", "Price","Time"])
+# Stream the results into an Excel CSV file as they are scraped
+sink = RecordSink(r'PriceList.csv', columns=["Product", "Name", "Price","Time"], encoding='utf-8-sig')
 
 # Define a list of websites to scrape
 websites = [
@@ -26,14 +29,37 @@ websites = [
     'https://www.nike.com/gb/t/air-jordan-1-retro-high-og-shoes-lZQrDX/DZ5485-051'
 ]
 
-# Loop through the websites
-for website in websites:
-    browser.get(website)
+# Get the current time in London as HH:MM:SS
+def london_time():
+    return datetime.now(pytz.timezone('Europe/London')).strftime("%H:%M:%S")
+
+# What the recrawl store keeps of an output row: everything but the scrape time
+def stored_row(data):
+    return {k: v for k, v in data.items() if k != "Time"}
+
+# Turn a record read from the page's embedded JSON state into an output row
+def state_row(website, state):
+    price = state['sale_price'] if state['sale_price'] is not None else state['price']
+    return {"Product": website, "Name": state['name'], "Price": price, "Time": london_time()}
+
+# Websites whose page loaded in the browser without the product on it
+absent = set()
+
+# Scrape one website with a browser borrowed from the pool
+def scrape_website(browser, website):
+    with metrics.stage('browser_load'):
+        browser.get(website)
+
+    # The rendered page may still carry the JSON state, which avoids waiting on the XPaths
+    state = extract_state(browser.page_source, website)
+    if state:
+        return state_row(website, state)
+
     try:
-        # Attempt to find the price element by its xPath and product name
-        price = WebDriverWait(browser, 20).until(EC.presence_of_element_located((By.XPATH, '//*[@id="PDP"]/div[2]/div/div[4]/div[1]/div/div[2]/div/div/div/div/div')))
-        product_name = WebDriverWait(browser, 20).until(
-            EC.presence_of_element_located((By.XPATH, '/html/body/div[4]/div/div/div[2]/div/div[4]/div[1]/div/div[2]/div/h1')))
+        # Read the price and product name from the page, trying each field's fallback selectors
+        # (test hooks, class names, then the old absolute paths) against one snapshot at a time
+        fields = read_fields(browser, timeout=20)
+        price, product_name = fields["price"], fields["name"]
 
         # Get the timezone object for London
         tz_London = pytz.timezone('Europe/London')
@@ -41,15 +67,69 @@ for website in websites:
         # Get the current time in London
         datetime_London = datetime.now(tz_London)
 
-        # If found, extract the text and add time to the DataFrame
-        df = df._append({"Product": website, "Name": product_name.get_attribute('innerHTML'), "Price": price.get_attribute('innerHTML'),"Time": datetime_London.strftime("%H:%M:%S")}, ignore_index=True)
-        print("Price for", website, ":","Product Name: " + product_name.get_attribute('innerHTML'), "Price: " + price.get_attribute('innerHTML'), "London time:", datetime_London.strftime("%H:%M:%S"))
-    except:
-        # If the element is not found, print an error message
-        print("Price or Product was not found for", website)
+        # If found, print the text, which selectors matched, and add time
+        print("Price for", website, ":","Product Name: " + product_name, "Price: " + price, "London time:", datetime_London.strftime("%H:%M:%S"), "Matched:", fields["matched"])
+        return {"Product": website, "Name": product_name, "Price": price,"Time": datetime_London.strftime("%H:%M:%S")}
+    except FieldsMissing as e:
+        # The page loaded but a field is not on it: report it at once, a retry would not help
+        print("Price or Product was not found for", website, ":", e)
+        absent.add(website)
+        return None
+    except TimeoutException:
+        # The page never finished loading: let the pool back off and retry
+        print("Page did not load for", website)
+        raise
+
+# Every snapshot is also appended to the date-partitioned price history
+history = PriceHistory('price_history')
+
+# Price drops, rises, new and delisted products are compared against the last run as they
+# are scraped and streamed to price_alerts.jsonl
+alerts = alert_stream('price_alerts.jsonl')
+
+# Canonicalise the list and drop repeated style codes
+websites = list(Frontier().filter(websites))
+
+# Read as many websites as possible straight from their embedded JSON state, without a browser.
+# Products fetched within the last hour, or unchanged since the last run, are not downloaded
+# again; their last record comes from the store, so the CSV still lists every website.
+store = RecrawlStore('crawl_state.sqlite', max_age=3600)
+found, missing = scrape_state(websites, store=store)
+for website in websites:
+    if website in found:
+        state = found[website]
+        data = state_row(website, state)
+        store.record_content(website, stored_row(data))
+        history.append(website, data["Price"], name=data["Name"], currency=state['currency'],
+                       category=state['categories'][0] if state['categories'] else None)
+        print("Price for", website, ":", "Product Name: " + data["Name"], "Price: " + str(data["Price"]), "London time:", data["Time"])
+        sink.write(data)
+        alerts.observe(website, data["Price"], name=data["Name"], currency=state['currency'])
+    elif website not in missing:
+        cached = store.cached(website)
+        if cached:
+            sink.write(dict(cached, Time=london_time()))
+
+# Fall back to a pool of reusable headless browsers for the rest, using the lean profile
+# (eager page loads, images/fonts/video/trackers blocked through DevTools)
+pool = BrowserPool(size=POOL_SIZE, max_pages=PAGES_PER_BROWSER, options_factory=lean_options, setup=block_resources)
+for data in pool.map(scrape_website, missing):
+    if data:
+        sink.write(data)
+        store.record_content(data["Product"], stored_row(data))
+        history.append(data["Product"], data["Price"], name=data["Name"])
+        alerts.observe(data["Product"], data["Price"], name=data["Name"])
+
+# Websites whose rendered page lacked the product count towards being delisted; pages that
+# failed to load say nothing about the product and are not counted
+for website in absent:
+    alerts.missed(website)
 
-# Close the browser
-browser.quit()
+# Flush the remaining rows and close the CSV file
+store.close()
+sink.close()
+history.flush()
+alerts.close()
 
-# Save data frame data into an Excel CSV file
-df.to_csv(r'PriceList.csv', index=False, encoding='utf-8-sig')
\ No newline at end of file
+# Export the per-stage timings and counters (JSON log / Prometheus file, see Nike_Metrics.py)
+metrics.report()
\ No newline at end of file
@@ -1,107 +1,150 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime
 import pytz
 import urllib.parse
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-# Prompt the user for the product name
-product_name = input("Enter the product name to search on Nike: ")
-
-# URL-encode the product name
-product_name_encoded = urllib.parse.quote_plus(product_name)
-
-# Construct the search URL
-search_url = f"https://www.nike.com/gb/w?q={product_name_encoded}"
-
-# Make a request to the search URL
-response = requests.get(search_url)
-response.raise_for_status()  # Ensure the request was successful
-
-# Parse the HTML content with BeautifulSoup
-soup = BeautifulSoup(response.text, 'html.parser')
-
-# Extract the product URLs from the search results
-product_elements = soup.select('div.product-grid a.product-card__link-overlay')
-product_urls = [elem['href'] for elem in product_elements]
-
-# Create an empty DataFrame to store the results
-df = pd.DataFrame(columns=["Product", "Name", "Price", "Time", "Category", "Subcategory", "Sub-subcategory"])
-
-# Loop through the product URLs
-for url in product_urls:
-    full_url = "https://www.nike.com" + url  # Prepend domain to relative URLs
-    product_response = requests.get(full_url)
-    product_response.raise_for_status()
-
-    product_soup = BeautifulSoup(product_response.text, 'html.parser')
-
-    try:
-        # Extract product name
-        product_name_elem = product_soup.select_one('h1.headline')
-        product_name_text = product_name_elem.text.strip() if product_name_elem else 'N/A'
-
-        # Extract price
-        price_elem = product_soup.select_one('div[data-test="product-price"]')
-        price_text = price_elem.text.strip() if price_elem else 'N/A'
+from Nike_Async_Fetcher import fetch_pages
+from Nike_Frontier import DEFAULT_REGION, Frontier, storefront
+from Nike_Metrics import metrics
+from Nike_Page_Archive import page_archive
+from Nike_Price_Alerts import alert_stream
+from Nike_Parsers import get_parser
+from Nike_Price_History import PriceHistory
+from Nike_Rate_Governor import governed_get
+from Nike_Record_Sink import RecordSink
+from Nike_Recrawl_Store import RecrawlStore
+from Nike_State_Extractor import extract_state
+
+COLUMNS = ["Product", "Name", "Price", "Time", "Category", "Subcategory", "Sub-subcategory"]
+
+
+# Search one Nike storefront and return the product URLs listed on the results page, one per style code
+def search_product_urls(product_name, frontier=None, region=DEFAULT_REGION):
+    from bs4 import BeautifulSoup
+
+    # URL-encode the product name
+    product_name_encoded = urllib.parse.quote_plus(product_name)
+
+    # Construct the search URL
+    search_url = f"{storefront(region)}/w?q={product_name_encoded}"
+
+    # Make a request to the search URL
+    with metrics.stage('download'):
+        response = governed_get(search_url)  # Backs off and retries on 429/503/timeouts
+    metrics.count('http_responses', status=response.status_code)
+    response.raise_for_status()  # Ensure the request was successful
+    if page_archive is not None:
+        page_archive.add(search_url, response.text, kind='search')
+
+    # Parse the HTML content with BeautifulSoup
+    soup = BeautifulSoup(response.text, 'html.parser')
+
+    # Extract the product URLs from the search results
+    product_elements = soup.select('div.product-grid a.product-card__link-overlay')
+    frontier = frontier or Frontier()
+    return list(frontier.filter(elem['href'] for elem in product_elements))  # Canonical absolute URLs, no repeats
+
+
+# Extract name, price and breadcrumb categories from a product page.
+# In 'state' mode the embedded JSON state is read first and the DOM is only parsed when it is missing.
+def extract_product(full_url, html, parser=None, mode='state'):
+    state = extract_state(html, full_url) if mode == 'state' else None
+    if state:
+        product_name_text = state['name']
+        price_text = state['sale_price'] if state['sale_price'] is not None else state['price']
+        categories = state['categories']
+    else:
+        # Parse only the name, price and breadcrumb subtrees with the precompiled PDP selectors
+        fields = (parser or get_parser()).parse_pdp(html)
+
+        # Extract product name and price
+        product_name_text = fields['name'] or 'N/A'
+        price_text = fields['price'] or 'N/A'
 
         # Extract category information from breadcrumbs
-        category_elems = product_soup.select('nav[aria-label="Breadcrumbs"] li a')
-        categories = [elem.text.strip() for elem in category_elems]
-
-        # Get the current time in London
-        tz_London = pytz.timezone('Europe/London')
-        datetime_London = datetime.now(tz_London)
-
-        # Prepare data for DataFrame
-        data = {
-            "Product": full_url,
-            "Name": product_name_text,
-            "Price": price_text,
-            "Time": datetime_London.strftime("%H:%M:%S"),
-            "Category": categories[0] if len(categories) > 0 else '',
-            "Subcategory": categories[1] if len(categories) > 1 else '',
-            "Sub-subcategory": categories[2] if len(categories) > 2 else ''
-        }
-
-        # Append data to DataFrame
-        df = df._append(data, ignore_index=True)
-
-        print(f"Scraped data for product: {product_name_text}")
-    except Exception as e:
-        print(f"Failed to scrape product at {full_url}: {e}")
-
-# Save the DataFrame to a CSV file
-df.to_csv('PriceList.csv', index=False, encoding='utf-8-sig')
-
-# Data Visualization with Seaborn
-# Clean the 'Price' column to extract numerical values
-df['Price_Clean'] = df['Price'].replace('[^0-9.]', '', regex=True).astype(float)
-
-# Bar plot of product prices
-plt.figure(figsize=(12, 6))
-sns.barplot(x='Name', y='Price_Clean', data=df)
-plt.xticks(rotation=90)
-plt.title('Prices of Products')
-plt.xlabel('Product Name')
-plt.ylabel('Price (£)')
-plt.tight_layout()
-plt.show()
-
-# Box plot of prices by category
-plt.figure(figsize=(12, 6))
-sns.boxplot(x='Category', y='Price_Clean', data=df)
-plt.title('Price Distribution by Category')
-plt.xlabel('Category')
-plt.ylabel('Price (£)')
-plt.show()
-
-# Histogram of price distribution
-plt.figure(figsize=(12, 6))
-sns.histplot(df['Price_Clean'], kde=True)
-plt.title('Price Distribution')
-plt.xlabel('Price (£)')
-plt.ylabel('Frequency')
-plt.show()
+        categories = fields['categories']
+
+    # Get the current time in London
+    tz_London = pytz.timezone('Europe/London')
+    datetime_London = datetime.now(tz_London)
+
+    # Prepare data for DataFrame
+    return {
+        "Product": full_url,
+        "Name": product_name_text,
+        "Price": price_text,
+        "Time": datetime_London.strftime("%H:%M:%S"),
+        "Category": categories[0] if len(categories) > 0 else '',
+        "Subcategory": categories[1] if len(categories) > 1 else '',
+        "Sub-subcategory": categories[2] if len(categories) > 2 else ''
+    }
+
+
+# Fetch all product pages concurrently and stream each one to the sink as it arrives.
+# With a RecrawlStore, only stale products are fetched; the rest (and pages answered 304)
+# are written from the store's copy of their last complete record.
+# With a PriceChangeDetector, price changes are streamed out as each product arrives, and a
+# product whose page loaded without a name or price counts towards it being delisted (a
+# failed download does not: that says nothing about the product).
+def scrape_products(product_urls, sink, concurrency=16, per_host=4, store=None, history=None, alerts=None):
+    scraped = set()
+
+    def handle_page(full_url, html):
+        try:
+            data = extract_product(full_url, html)
+            complete = data["Name"] != 'N/A' and data["Price"] != 'N/A'
+            if store and complete:
+                store.record_content(full_url, {k: v for k, v in data.items() if k != "Time"})
+            sink.write(data)
+            scraped.add(full_url)
+            if history is not None:
+                history.append(full_url, data["Price"], name=data["Name"], category=data["Category"] or None)
+            if alerts is not None and complete:
+                alerts.observe(full_url, data["Price"], name=data["Name"])
+            elif alerts is not None:
+                alerts.missed(full_url)
+            print(f"Scraped data for product: {data['Name']}")
+        except Exception as e:
+            print(f"Failed to scrape product at {full_url}: {e}")
+
+    failed = set(fetch_pages(product_urls, handle_page, concurrency=concurrency, per_host=per_host, store=store))
+    if store:
+        now = datetime.now(pytz.timezone('Europe/London')).strftime("%H:%M:%S")
+        for full_url in product_urls:
+            cached = store.cached(full_url) if full_url not in scraped and full_url not in failed else None
+            if cached:
+                sink.write(dict(cached, Time=now))
+
+
+# Render this run's prices to files without a display: histogram by category and the
+# cheapest products, aggregated rather than one bar per product (the plotting stack is only loaded here)
+def visualize(df, out_dir='report'):
+    from Nike_Price_Normalizer import normalize_prices
+    from Nike_Report import render_prices
+
+    # Clean the 'Price' column to extract numerical values ('N/A' becomes NaN)
+    df['Price_Clean'] = normalize_prices(df['Price'])['current_price']
+    return render_prices(df, out_dir, category_col='Category')
+
+
+def main():
+    # Prompt the user for the product name
+    product_name = input("Enter the product name to search on Nike: ")
+    product_urls = search_product_urls(product_name)
+
+    # Stream the results to a CSV file, then load the finished DataFrame
+    sink = RecordSink('PriceList.csv', COLUMNS, encoding='utf-8-sig')
+    with RecrawlStore('crawl_state.sqlite') as store, PriceHistory('price_history') as history, \
+            alert_stream('price_alerts.jsonl') as alerts:
+        scrape_products(product_urls, sink, store=store, history=history, alerts=alerts)
+    df = sink.to_dataframe()
+    metrics.report()
+
+    visualize(df)
+
+    # Report over the whole price history: trends, discounts vs. the highest price seen
+    from Nike_Report import build_report
+    build_report('price_history', 'report/history')
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,16 @@ from selenium.webdriver.chrome.service import Service
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager  # Import the manager
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
-from chromedriver_py import binary_path
-import pandas as pd
+from Nike_Browser_Pool import resolve_driver
+from Nike_Lean_Browser import FieldsMissing, read_fields
+from Nike_Price_Normalizer import normalize_prices
+from Nike_Rate_Governor import RateGovernor, governed_call
+from Nike_Record_Sink import RecordSink
 import time
 from datetime import datetime
 import pytz
-import seaborn as sns
-import matplotlib.pyplot as plt
 
 # Function to generate Nike URL based on the product name
 def generate_nike_url(product_name):
@@ -22,12 +23,12 @@ def generate_nike_url(product_name):
     search_url = base_url + 'gb/search?q=' + product_name.replace(' ', '%20')
     return search_url
 
-# Initialize Selenium WebDriver
-svc = Service(executable_path=binary_path)
+# Initialize Selenium WebDriver with the cached chromedriver matching the installed Chrome
+svc = Service(executable_path=resolve_driver())
 browser = webdriver.Chrome(service=svc)
 
-# Create an empty DataFrame to store the results
-df = pd.DataFrame(columns=["Product", "Name", "Price", "Type", "Subcategory", "Time"])
+# Stream the results into an Excel CSV file
+sink = RecordSink(r'NikePriceList.csv', columns=["Product", "Name", "Price", "Type", "Subcategory", "Time"], encoding='utf-8-sig')
 
 # User Input for Product Details
 product_name = input("Enter the Nike product name you want to scrape: ")
@@ -37,53 +38,42 @@ subcategory = input("Enter the subcategory (Shoes, Clothing, Accessories, etc.):
 # Generate the URL for the product
 url = generate_nike_url(product_name)
 
-# Open the URL with the browser
-browser.get(url)
+# Open the URL with the browser and read the price and product name with the shared fallback selectors
+def load_product():
+    browser.get(url)
+    return read_fields(browser, timeout=20)
 
 try:
-    # Attempt to find the price and product name
-    price = WebDriverWait(browser, 20).until(EC.presence_of_element_located((By.XPATH, '//*[@data-test="product-price"]')))
-    product_title = WebDriverWait(browser, 20).until(EC.presence_of_element_located((By.XPATH, '//*[@data-test="product-title"]')))
+    # A timed-out load is retried with jittered backoff before giving up
+    fields = governed_call(url, load_product, TimeoutException, RateGovernor(maximum=1, name='browser'))
+    price, product_title = fields["price"], fields["name"]
 
     # Get the timezone object for London
     tz_London = pytz.timezone('Europe/London')
     datetime_London = datetime.now(tz_London)
 
-    # Append the data to the DataFrame
-    df = df._append({
+    # Write the data to the CSV file
+    sink.write({
         "Product": url, 
-        "Name": product_title.get_attribute('innerHTML'),
-        "Price": price.get_attribute('innerHTML'),
+        "Name": product_title,
+        "Price": price,
         "Type": product_type,
         "Subcategory": subcategory,
         "Time": datetime_London.strftime("%H:%M:%S")
-    }, ignore_index=True)
+    })
     
-    print(f"Product: {product_title.get_attribute('innerHTML')} | Price: {price.get_attribute('innerHTML')} | Time: {datetime_London.strftime('%H:%M:%S')}")
+    print(f"Product: {product_title} | Price: {price} | Time: {datetime_London.strftime('%H:%M:%S')}")
     
-except Exception as e:
+except (TimeoutException, FieldsMissing, WebDriverException) as e:
     print(f"Error: {str(e)}")
 
 # Close the browser
 browser.quit()
 
-# Save data into an Excel CSV file
-df.to_csv(r'NikePriceList.csv', index=False, encoding='utf-8-sig')
+# Finish the CSV file and load it back for plotting
+df = sink.to_dataframe()
+df["Price_Clean"] = normalize_prices(df["Price"])["current_price"]
 
-# Data Visualization with Seaborn
-sns.set(style="whitegrid")
-
-# Plot Price Distribution per Category
-plt.figure(figsize=(10, 6))
-sns.histplot(data=df, x="Price", hue="Type", kde=True, bins=20)
-plt.title('Price Distribution by Product Type')
-plt.xlabel('Price')
-plt.ylabel('Frequency')
-plt.show()
-
-# Plot Price by Subcategory
-plt.figure(figsize=(12, 6))
-sns.boxplot(x="Subcategory", y="Price", data=df)
-plt.title('Price Distribution per Subcategory')
-plt.xticks(rotation=45)
-plt.show()
+# Render the price distribution per product type to files, no display needed
+from Nike_Report import render_prices
+render_prices(df, 'report', category_col='Type')
@@ -3,52 +3,85 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from chromedriver_py import binary_path  # This will provide the correct path to the Chrome WebDriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager  # Import the manager
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 
 
-import pandas as pd
 import time
+import itertools
 from datetime import datetime
 import pytz
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+from Nike_Browser_Pool import BrowserPool, forget_driver, resolve_driver
+from Nike_Frontier import Frontier
+from Nike_Lean_Browser import FieldsMissing, block_resources, lean_options, read_fields
+from Nike_Metrics import metrics
+from Nike_Price_History import PriceHistory
+from Nike_Rate_Governor import RateGovernor, governed_call
+from Nike_Record_Sink import RecordSink
+from Nike_Recrawl_Store import RecrawlStore
+from Nike_State_Extractor import extract_state, scrape_state
 
 
 # Initialize the browser with the correct ChromeDriver version
 def init_browser():
-    # Use webdriver-manager to automatically download the correct version
-    svc = Service(ChromeDriverManager().install())
-    browser = webdriver.Chrome(service=svc)
-    return browser
+    # Driver matching the installed Chrome, resolved by webdriver-manager once and then cached;
+    # a cached driver that no longer matches Chrome is resolved again
+    try:
+        return webdriver.Chrome(service=Service(resolve_driver()))
+    except SessionNotCreatedException:
+        forget_driver()
+        return webdriver.Chrome(service=Service(resolve_driver()))
 
 
 # Scrape product data from a Nike product page
 
+# The single search browser loads one page at a time; timed-out searches back off and retry
+search_governor = RateGovernor(maximum=1, name='browser')
+
 # Search for product on Nike's website
 def search_nike_product(browser, product_name):
     search_url = f"https://www.nike.com/w?q={product_name.replace(' ', '%20')}"
-    browser.get(search_url)
-    try:
-        # Get first product URL
+
+    def first_product_url():
+        with metrics.stage('browser_load'):
+            browser.get(search_url)
         product_element = WebDriverWait(browser, 20).until(
             EC.presence_of_element_located((By.XPATH, '//a[contains(@class, "product-card__link-overlay")]')))
-        product_url = product_element.get_attribute('href')
-        return product_url
+        return product_element.get_attribute('href')
+
+    try:
+        # Get first product URL
+        return governed_call(search_url, first_product_url, TimeoutException, search_governor)
     except Exception as e:
         print(f"Error finding product for {product_name}: {e}")
         return None
 
+# Turn a record read from the page's embedded JSON state into an output row
+def state_row(url, state):
+    tz_London = pytz.timezone('Europe/London')
+    datetime_London = datetime.now(tz_London)
+    return {
+        "Product URL": url,
+        "Product Name": state['name'],
+        "Price": state['sale_price'] if state['sale_price'] is not None else state['price'],
+        "Time": datetime_London.strftime("%H:%M:%S")
+    }
+
 # Scrape product data from Nike product page
 def scrape_product_data(browser, url):
-    browser.get(url)
+    with metrics.stage('browser_load'):
+        browser.get(url)
+
+    # Read the embedded JSON state first; only wait on the rendered elements when it is missing
+    state = extract_state(browser.page_source, url)
+    if state:
+        return state_row(url, state)
+
     try:
-        # Extract product name and price
-        product_name = WebDriverWait(browser, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//h1[contains(@class, "headline-5")]'))).get_attribute('innerHTML')
-        price = WebDriverWait(browser, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//div[@data-test="product-price"]'))).get_attribute('innerHTML')
+        # Extract product name and price with the shared fallback selectors
+        fields = read_fields(browser, timeout=20)
+        product_name = fields["name"]
+        price = fields["price"]
 
         # Get the current time in London
         tz_London = pytz.timezone('Europe/London')
@@ -61,9 +94,14 @@ def scrape_product_data(browser, url):
             "Time": datetime_London.strftime("%H:%M:%S")
         }
 
-    except Exception as e:
+    except FieldsMissing as e:
+        # Loaded, but the fields are not on the page; retrying would not help
         print(f"Error fetching data for {url}: {e}")
         return None
+    except TimeoutException as e:
+        # Let the pool's governor back off and retry the page
+        print(f"Error fetching data for {url}: {e}")
+        raise
 
 # Ask user to input the product name and search for the URL
 def get_product_urls(browser):
@@ -85,56 +123,73 @@ def assign_product_category():
     sub_subcategory = input("Sub-Subcategory (e.g., Running, Football, etc.): ").strip()
     return category, subcategory, sub_subcategory
 
-# Store and export data to CSV
-def store_data(dataframe, file_name='PriceList.csv'):
-    dataframe.to_csv(file_name, index=False, encoding='utf-8-sig')
-    print(f"Data saved to {file_name}")
-
-# Visualize the data using Seaborn
-def visualize_data(df):
-    sns.set(style='whitegrid')
+# Store and export data to CSV, writing rows as they are scraped
+def store_data(file_name='PriceList.csv'):
+    return RecordSink(file_name, ["Product URL", "Product Name", "Price", "Time", "Category", "Subcategory", "Sub-Subcategory"], encoding='utf-8-sig')
 
-    # Plot price distribution per category
-    plt.figure(figsize=(12, 6))
-    sns.histplot(data=df, x='Price', hue='Category', kde=True, bins=20)
-    plt.title('Price Distribution by Category')
-    plt.show()
+# Render the data to files without a display: this run's price histogram per category,
+# then the trends and discounts from the full price history (the plotting stack is only loaded here)
+def visualize_data(df, history):
+    from Nike_Price_Normalizer import normalize_prices
+    from Nike_Report import build_report, render_prices
 
-    # Plot the price trends
-    plt.figure(figsize=(12, 6))
-    sns.lineplot(data=df, x='Time', y='Price', hue='Category', marker='o')
-    plt.title('Price Trend Over Time')
-    plt.show()
+    # The Price column holds raw innerHTML or numbers; normalize it for plotting
+    df['Price_Clean'] = normalize_prices(df['Price'])['current_price']
+    render_prices(df, 'report', name_col='Product Name', category_col='Category')
+    build_report(history.root, 'report/history')
 
 # Main function to run the scraper
-def main():
+def main(pool_size=4, pages_per_browser=50):
     # Initialize browser
     browser = init_browser()
 
-    # Get product URLs from user
-    product_urls = get_product_urls(browser)
-
-    # Create an empty DataFrame to store the results
-    df = pd.DataFrame(columns=["Product URL", "Product Name", "Price", "Time", "Category", "Subcategory", "Sub-Subcategory"])
-
-    # Scrape product data
-    for url in product_urls:
-        data = scrape_product_data(browser, url)
-        if data:
-            category, subcategory, sub_subcategory = assign_product_category()
-            data["Category"] = category
-            data["Subcategory"] = subcategory
-            data["Sub-Subcategory"] = sub_subcategory
-            df = df.append(data, ignore_index=True)
+    # Get product URLs from user, one per style code
+    product_urls = list(Frontier().filter(get_product_urls(browser)))
 
-    # Close the browser
+    # Close the search browser
     browser.quit()
 
-    # Store the data
-    store_data(df)
+    # Open the CSV output that results are streamed into, and the append-only price history
+    sink = store_data()
+    history = PriceHistory('price_history')
+
+    # Read most products straight from their embedded JSON state, falling back to
+    # a pool of reusable headless browsers only for pages without it
+    # (products fetched within the last hour, or unchanged since the last run, are not
+    # downloaded again and are written from the store's copy of their last record)
+    with RecrawlStore('crawl_state.sqlite', max_age=3600) as store:
+        found, missing = scrape_state(product_urls, store=store)
+        results = [state_row(url, state) for url, state in found.items()]
+        if missing:
+            pool = BrowserPool(size=pool_size, max_pages=pages_per_browser, driver_path=resolve_driver(),
+                               options_factory=lean_options, setup=block_resources)
+            results = itertools.chain(results, pool.map(scrape_product_data, missing))
+
+        for data in results:
+            if data:
+                print(f"Scraped {data['Product Name']} ({data['Product URL']})")
+                category, subcategory, sub_subcategory = assign_product_category()
+                data["Category"] = category
+                data["Subcategory"] = subcategory
+                data["Sub-Subcategory"] = sub_subcategory
+                sink.write(data)
+                store.record_content(data["Product URL"], {k: v for k, v in data.items() if k != "Time"})
+                history.append(data["Product URL"], data["Price"], name=data["Product Name"], category=category)
+
+        for url in product_urls:
+            if url not in found and url not in missing:
+                cached = store.cached(url)
+                if cached:
+                    sink.write(dict(cached, Time=datetime.now(pytz.timezone('Europe/London')).strftime("%H:%M:%S")))
+
+    # Finish storing the data
+    df = sink.to_dataframe()
+    history.flush()
+    print(f"Data saved to {sink.path}")
+    metrics.report()
 
     # Visualize the data
-    visualize_data(df)
+    visualize_data(df, history)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,111 +1,87 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+
+from Nike_Frontier import DEFAULT_REGION, REGION_CURRENCIES, canonicalize_url, product_key, storefront
+from Nike_Metrics import metrics
+from Nike_Parsers import get_parser
+from Nike_Price_Normalizer import normalize_prices
+from Nike_Record_Sink import RecordSink
+from Nike_Search_Harvester import harvest
+
+CSV_PATH = "F:\\data\\Nike_Web_Crawler-main\\Price.csv"  # Adjust the path
 
 # Function to generate the Nike search URL
-def generate_nike_url(product_name, page_number=1):
-    base_url = f'https://www.nike.com/gb/w?q={product_name.replace(" ", "+")}&page={page_number}'
+def generate_nike_url(product_name, page_number=1, region=DEFAULT_REGION):
+    base_url = f'{storefront(region)}/w?q={product_name.replace(" ", "+")}&page={page_number}'
     return base_url
 
-# Function to fetch the HTML content from Nike's website
-def get_data(url):
-    r = requests.get(url)
-    r.raise_for_status()  # Ensure the request was successful
-    soup = BeautifulSoup(r.text, 'html.parser')
-    return soup
-
-# Function to parse product details from Nike's HTML content
-def parse(soup):
-    results = soup.find_all('div', {'class': 'product-card__body'})
+# Function to parse product details from Nike's HTML content (prices without a symbol are in the region's currency)
+def parse(html, parser=None, region=DEFAULT_REGION):
+    parser = parser or get_parser()  # Precompiled card selectors, fastest installed backend
+    cards = parser.parse_cards(html)
     productlist = []
-
-    for item in results:
-        title_elem = item.find('div', {'class': 'product-card__title'})
-        price_elem = item.find('div', {'class': 'product-price'})
-        link_elem = item.find('a', {'class': 'product-card__link-overlay'})
-
-        if title_elem and price_elem and link_elem:
-            title = title_elem.text.strip()
-            price = price_elem.text.strip().replace('£', '').replace(',', '')
-            link = 'https://www.nike.com' + link_elem['href']
-
-            product = {
-                'Name': title,
-                'Price': float(price) if price else 0.0,  # Convert price to float
-                'Link': link  # Moved link after price
-            }
-            productlist.append(product)
-            print(product)
+    if not cards:
+        return productlist
+
+    # Normalize every price on the page in one batch (sale, strike-through and ranges included)
+    prices = normalize_prices([price for _, price, _ in cards], default_currency=REGION_CURRENCIES.get(region))
+
+    for (title, _, href), price in zip(cards, prices.itertuples(index=False)):
+        link = canonicalize_url(href)  # Handles relative and already-absolute links alike
+
+        product = {
+            'Name': title,
+            'Price': price.current_price,
+            'Original Price': price.original_price,
+            'Discount (%)': price.discount_pct,
+            'Currency': price.currency,
+            'Link': link  # Moved link after price
+        }
+        productlist.append(product)
+        print(product)
     
     return productlist
 
-# Function to output the scraped data to a CSV
-def output(productlist):
-    productsdf = pd.DataFrame(productlist)
-    csv_path = "F:\\data\\Nike_Web_Crawler-main\\Price.csv"
-    productsdf.to_csv(csv_path, index=False)  # Adjust the path
-    print(f'Saved to CSV at {csv_path}')
-    return productsdf
+# Function to open the CSV output that products are streamed into
+def output(csv_path=CSV_PATH):
+    return RecordSink(csv_path, ['Name', 'Price', 'Original Price', 'Discount (%)', 'Currency', 'Link'], encoding='utf-8',
+                      types={'Price': 'float64', 'Original Price': 'float64', 'Discount (%)': 'float64'})
 
-# Function to scrape multiple pages from Nike
-def search_nike():
+# Function to scrape search result pages from one Nike storefront until the results run out
+def search_nike(window=4, max_pages=100, region=DEFAULT_REGION):
+    if region not in REGION_CURRENCIES:
+        raise ValueError(f"Unknown storefront {region!r}; expected one of {', '.join(sorted(REGION_CURRENCIES))}")
     product_name = input("Enter the product name to search on Nike: ")
-    total_pages = int(input("Enter the number of pages to scrape: "))
 
-    all_productlist = []
+    sink = output()
 
-    for page in range(1, total_pages + 1):
-        print(f"Scraping page {page}...")
-        url = generate_nike_url(product_name, page)
-        soup = get_data(url)
-        productlist = parse(soup)
-        all_productlist.extend(productlist)
+    # Pages are fetched `window` at a time and products stream into the CSV as they arrive
+    products = harvest(lambda page: generate_nike_url(product_name, page, region), lambda html: parse(html, region=region),
+                       key=lambda product: product_key(product['Link']), window=window, max_pages=max_pages)
+    sink.write_many(products)
 
-    productsdf = output(all_productlist)
+    productsdf = sink.to_dataframe()
+    print(f'Saved to CSV at {sink.path}')
+    metrics.report()
     return productsdf
 
 # Main function to run the scraping and data visualization process
 def main():
-    productsdf = search_nike()
-
-    # Load the CSV data for visualization
-    df = pd.read_csv("F:\\data\\Nike_Web_Crawler-main\\Price.csv")
+    parser = argparse.ArgumentParser(description="Search one Nike storefront and save every result page to CSV")
+    parser.add_argument("--region", default=DEFAULT_REGION, choices=sorted(REGION_CURRENCIES),
+                        help=f"storefront to search (default: {DEFAULT_REGION})")
+    args = parser.parse_args()
+    productsdf = search_nike(region=args.region)
+
+    # Use the scraped data for visualization
+    df = productsdf
     
     # Optional: Clean the price data
     df['Price_Clean'] = df['Price']
 
-    # Visualizations for the scraped data
-    sns.set(style='whitegrid')
-
-    # Bar plot of product prices
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x='Name', y='Price_Clean', data=df)
-    plt.xticks(rotation=90)
-    plt.title('Prices of Products')
-    plt.xlabel('Product Name')
-    plt.ylabel('Price (£)')
-    plt.tight_layout()
-    plt.show()
-
-    # Box plot of prices by product name (or category if available)
-    # You can replace 'Name' with a 'Category' field if your dataset has that.
-    plt.figure(figsize=(12, 6))
-    sns.boxplot(x='Name', y='Price_Clean', data=df)
-    plt.title('Price Distribution by Product')
-    plt.xlabel('Product Name')
-    plt.ylabel('Price (£)')
-    plt.xticks(rotation=90)
-    plt.show()
-
-    # Histogram of price distribution
-    plt.figure(figsize=(12, 6))
-    sns.histplot(df['Price_Clean'], kde=True)
-    plt.title('Price Distribution')
-    plt.xlabel('Price (£)')
-    plt.ylabel('Frequency')
-    plt.show()
+    # Render the report to files (no display needed): price histogram and top discounts,
+    # aggregated rather than one bar per product
+    from Nike_Report import render_prices
+    render_prices(df, 'report', discount_col='Discount (%)')
 
 if __name__ == "__main__":
     main()
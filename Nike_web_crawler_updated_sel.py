@@ -1,114 +1,77 @@
-import time
-import pandas as pd
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from Nike_Lean_Browser import block_resources, lean_options
+from Nike_Metrics import metrics
+from Nike_Price_Normalizer import normalize_prices
+from Nike_Rate_Governor import RateGovernor, governed_call
+from Nike_Record_Sink import RecordSink
+from Nike_Scroll_Harvester import harvest_cards
+
+CSV_PATH = "F:\\data\\Nike_Web_Crawler-main\\Price.csv"
 
 # Set up Selenium WebDriver
 def setup_driver():
-    options = Options()
-    options.add_argument("--headless")  # Run in headless mode (no GUI)
+    options = lean_options()  # Headless, eager page loads, no images
     service = Service("path_to_chromedriver")  # Replace with your ChromeDriver path
     driver = webdriver.Chrome(service=service, options=options)
-    return driver
-
-# Function to fetch and parse product details
-def parse(driver, product_list):
-    items = driver.find_elements(By.CSS_SELECTOR, 'div.product-card__body')
-    for item in items:
-        title_elem = item.find_element(By.CSS_SELECTOR, 'div.product-card__title')
-        price_elem = item.find_element(By.CSS_SELECTOR, 'div.product-price')
-        link_elem = item.find_element(By.CSS_SELECTOR, 'a.product-card__link-overlay')
+    return block_resources(driver)  # Block fonts, video and trackers through DevTools
 
-        title = title_elem.text.strip()
-        price = price_elem.text.strip().replace('£', '').replace(',', '')
-        link = 'https://www.nike.com' + link_elem.get_attribute('href')
+# Function to parse a batch of new product cards into the sink
+def parse(new_items, sink):
+    # Normalize the prices of all new cards in one batch (sale, strike-through and ranges included)
+    prices = normalize_prices([price for _, price, _ in new_items], default_currency='GBP')
 
+    for (title, _, link), price in zip(new_items, prices.itertuples(index=False)):
         product = {
             'Name': title,
-            'Price': float(price) if price else 0.0,
+            'Price': price.current_price,
+            'Original Price': price.original_price,
+            'Discount (%)': price.discount_pct,
+            'Currency': price.currency,
             'Link': link
         }
-        product_list.append(product)
+        sink.write(product)
         print(product)
 
-# Function to scroll and scrape all products
-def scrape_all_products(driver, product_name):
-    driver.get(f'https://www.nike.com/gb/w?q={product_name.replace(" ", "+")}')
-    
-    product_list = []
-    last_height = driver.execute_script("return document.body.scrollHeight")
-    
-    while True:
-        parse(driver, product_list)
-        
-        driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.END)
-        time.sleep(2)  # Wait for more products to load
-        
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
-    
-    return product_list
+# Function to scroll and scrape all products. New cards are written after every scroll
+# step; max_cards caps the harvest and max_seen bounds the dedup index for huge grids.
+def scrape_all_products(driver, product_name, sink, max_cards=None, max_seen=None):
+    url = f'https://www.nike.com/gb/w?q={product_name.replace(" ", "+")}'
+    with metrics.stage('browser_load'):
+        # A timed-out load is retried with jittered backoff before giving up
+        governed_call(url, lambda: driver.get(url), TimeoutException, RateGovernor(maximum=1, name='browser'))
 
-# Function to output the scraped data to a CSV
-def output(product_list):
-    productsdf = pd.DataFrame(product_list)
-    csv_path = "F:\\data\\Nike_Web_Crawler-main\\Price.csv"
-    productsdf.to_csv(csv_path, index=False)
-    print(f'Saved to CSV at {csv_path}')
-    return productsdf
+    for new_items in harvest_cards(driver, max_cards=max_cards, max_seen=max_seen):
+        parse(new_items, sink)
+
+# Function to open the CSV output that products are streamed into
+def output(csv_path=CSV_PATH):
+    return RecordSink(csv_path, ['Name', 'Price', 'Original Price', 'Discount (%)', 'Currency', 'Link'], encoding='utf-8',
+                      types={'Price': 'float64', 'Original Price': 'float64', 'Discount (%)': 'float64'})
 
 # Main function to run the scraping and data visualization process
 def main():
     product_name = input("Enter the product name to search on Nike: ")
     
     driver = setup_driver()
-    product_list = scrape_all_products(driver, product_name)
+    sink = output()
+    scrape_all_products(driver, product_name, sink)
     driver.quit()
-    
-    productsdf = output(product_list)
 
-    # Load the CSV data for visualization
-    df = pd.read_csv("F:\\data\\Nike_Web_Crawler-main\\Price.csv")
+    # Load the finished CSV data for visualization
+    df = sink.to_dataframe()
+    print(f'Saved to CSV at {sink.path}')
+    metrics.report()
     
     # Optional: Clean the price data
     df['Price_Clean'] = df['Price']
 
-    # Visualizations for the scraped data
-    sns.set(style='whitegrid')
-
-    # Bar plot of product prices
-    plt.figure(figsize=(12, 6))
-    sns.barplot(x='Name', y='Price_Clean', data=df)
-    plt.xticks(rotation=90)
-    plt.title('Prices of Products')
-    plt.xlabel('Product Name')
-    plt.ylabel('Price (£)')
-    plt.tight_layout()
-    plt.show()
-
-    # Box plot of prices by product name
-    plt.figure(figsize=(12, 6))
-    sns.boxplot(x='Name', y='Price_Clean', data=df)
-    plt.title('Price Distribution by Product')
-    plt.xlabel('Product Name')
-    plt.ylabel('Price (£)')
-    plt.xticks(rotation=90)
-    plt.show()
-
-    # Histogram of price distribution
-    plt.figure(figsize=(12, 6))
-    sns.histplot(df['Price_Clean'], kde=True)
-    plt.title('Price Distribution')
-    plt.xlabel('Price (£)')
-    plt.ylabel('Frequency')
-    plt.show()
+    # Render the report to files (no display needed): price histogram and top discounts,
+    # aggregated rather than one bar per product
+    from Nike_Report import render_prices
+    render_prices(df, 'report', discount_col='Discount (%)')
 
 if __name__ == "__main__":
     main()